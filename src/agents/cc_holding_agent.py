@@ -1,5 +1,6 @@
 from .utils import SystemMessage, AIMessage
 from .utils import AgentState, get_llm, CCHoldingResponse
+from .columnar import pack_results
 
 col_names_mapping_cc = {
     "cc_account_open_date": "credit card opening date",
@@ -31,7 +32,7 @@ def cc_holding_agent(state: AgentState):
     
     if result and result.get("parsed"):
         return {
-            "cc_holding_results": result["parsed"].items,
+            "cc_holding_results": pack_results(result["parsed"].items, state),
             "sender": "cc_holding_agent"
         }
     
@@ -0,0 +1,136 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Type, get_args, get_origin
+
+from pydantic import BaseModel
+
+# --- Columnar Result Tables ---
+# Agents hand back lists of pydantic rows. For large cohorts we keep them as
+# column lists instead: one parent table keyed by customer_id, plus one child
+# table per nested list field (e.g. profiles, cc_summary).
+
+RESULT_FORMAT_COLUMNAR = "columnar"
+
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    """Returns the row model for a List[Model] field, or None for scalar fields."""
+    if get_origin(annotation) in (list, List):
+        args = get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0]
+    return None
+
+
+@dataclass
+class ResultTable:
+    """
+    Column-oriented store for agent results.
+    `columns` maps field name -> list of values (always including customer_id),
+    `children` maps nested list field name -> child ResultTable whose rows carry
+    the parent's customer_id.
+    """
+    columns: Dict[str, List[Any]] = field(default_factory=dict)
+    children: Dict[str, "ResultTable"] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._index = None
+        self._child_index = {}
+
+    def __len__(self):
+        return len(self.columns.get("customer_id", []))
+
+    @property
+    def customer_ids(self) -> List[str]:
+        return self.columns.get("customer_id", [])
+
+    @classmethod
+    def from_models(cls, items: Iterable[BaseModel], schema: Optional[Type[BaseModel]] = None) -> "ResultTable":
+        items = list(items or [])
+        if schema is None:
+            if not items:
+                return cls(columns={"customer_id": []})
+            schema = type(items[0])
+
+        scalar_fields = [name for name, info in schema.model_fields.items() if _nested_model(info.annotation) is None]
+        nested_fields = {name: _nested_model(info.annotation) for name, info in schema.model_fields.items()
+                         if _nested_model(info.annotation) is not None}
+
+        columns = {name: [getattr(item, name) for item in items] for name in scalar_fields}
+        children = {}
+        for name, child_schema in nested_fields.items():
+            child_fields = list(child_schema.model_fields)
+            child_columns = {"customer_id": []}
+            child_columns.update({f: [] for f in child_fields})
+            for item in items:
+                for child in getattr(item, name) or []:
+                    child_columns["customer_id"].append(item.customer_id)
+                    for f in child_fields:
+                        child_columns[f].append(getattr(child, f))
+            children[name] = cls(columns=child_columns)
+        return cls(columns=columns, children=children)
+
+    def _row_index(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {cid: i for i, cid in enumerate(self.customer_ids)}
+        return self._index
+
+    def row(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the scalar fields for one customer, or None if absent."""
+        i = self._row_index().get(customer_id)
+        if i is None:
+            return None
+        return {name: values[i] for name, values in self.columns.items()}
+
+    def child_rows(self, name: str, customer_id: str) -> List[Dict[str, Any]]:
+        """Returns the nested rows (e.g. profiles) belonging to one customer."""
+        child = self.children.get(name)
+        if child is None:
+            return []
+        if name not in self._child_index:
+            positions: Dict[str, List[int]] = {}
+            for i, cid in enumerate(child.customer_ids):
+                positions.setdefault(cid, []).append(i)
+            self._child_index[name] = positions
+        return [
+            {f: values[i] for f, values in child.columns.items() if f != "customer_id"}
+            for i in self._child_index[name].get(customer_id, [])
+        ]
+
+    def to_models(self, schema: Type[BaseModel]) -> List[BaseModel]:
+        """Converts back to pydantic rows (API boundary only, see utils.results_as_models)."""
+        models = []
+        for cid in self.customer_ids:
+            values = self.row(cid)
+            for name, info in schema.model_fields.items():
+                child_schema = _nested_model(info.annotation)
+                if child_schema is not None:
+                    values[name] = [child_schema(**row) for row in self.child_rows(name, cid)]
+            models.append(schema(**values))
+        return models
+
+
+def pack_results(items: List[BaseModel], state) -> Any:
+    """Stores agent output in the representation requested by state['result_format']."""
+    if state.get("result_format") == RESULT_FORMAT_COLUMNAR:
+        return ResultTable.from_models(items)
+    return items
+
+
+def as_table(results) -> ResultTable:
+    """Normalizes either representation to a ResultTable for downstream consumers."""
+    if isinstance(results, ResultTable):
+        return results
+    return ResultTable.from_models(results or [])
+
+
+def format_table(table: ResultTable, customer_ids: Optional[Iterable[str]] = None) -> str:
+    """Renders one compact line per customer (optionally only `customer_ids`) for prompt building."""
+    lines = []
+    for cid in (table.customer_ids if customer_ids is None else customer_ids):
+        if table.row(cid) is None:
+            continue
+        parts = [f"{name}={value}" for name, value in table.row(cid).items()]
+        for name in table.children:
+            nested = "; ".join(", ".join(f"{k}={v}" for k, v in r.items()) for r in table.child_rows(name, cid))
+            parts.append(f"{name}=[{nested}]")
+        lines.append(" | ".join(parts))
+    return "\n".join(lines)
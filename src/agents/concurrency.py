@@ -0,0 +1,240 @@
+import os
+import random
+import threading
+import time
+
+# --- Adaptive Concurrency Control for LLM Calls ---
+# One controller is shared by every structured-output runnable created through
+# get_llm(). It combines:
+#   * AIMD concurrency: +1 slot per `limit` successes of calls that ran at the
+#     limit (idle capacity doesn't grow it), x`decrease_factor` on throttling
+#   * token buckets for requests/minute and (estimated) tokens/minute
+#   * retry with full-jitter exponential backoff on throttling errors
+
+THROTTLE_ERROR_CODES = ("ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException")
+
+
+class ThrottlingError(Exception):
+    """Raised by the backend (or MockBedrockLLM) when a request is throttled."""
+
+
+def is_throttling_error(exc) -> bool:
+    if isinstance(exc, ThrottlingError):
+        return True
+    # botocore ClientError carries the error code in exc.response
+    code = getattr(exc, "response", {}) or {}
+    code = code.get("Error", {}).get("Code") if isinstance(code, dict) else None
+    if code in THROTTLE_ERROR_CODES:
+        return True
+    text = f"{type(exc).__name__} {exc}"
+    return "Throttl" in text or "Too many requests" in text or "Rate exceeded" in text
+
+
+def estimate_tokens(messages) -> int:
+    """Rough input token estimate (~4 characters per token)."""
+    return max(1, len(str(messages)) // 4)
+
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at `per_minute` tokens per minute."""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyController:
+    """
+    Gates LLM calls with an AIMD concurrency limit and optional RPM/TPM buckets.
+    Use `controller.call(fn, tokens=...)` or wrap a runnable with ControlledRunnable.
+    """
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64, decrease_factor=0.5,
+                 requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=5, base_delay=0.5, max_delay=20.0, decrease_cooldown=1.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.decrease_cooldown = decrease_cooldown
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        self._cond = threading.Condition()
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.successes = 0
+        self.throttles = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls):
+        """Builds a controller from FINGENIE_LLM_* environment variables."""
+        def env_int(name, default=None):
+            value = os.getenv(name)
+            return int(value) if value else default
+        return cls(
+            initial_limit=env_int("FINGENIE_LLM_CONCURRENCY", 4),
+            max_limit=env_int("FINGENIE_LLM_MAX_CONCURRENCY", 64),
+            requests_per_minute=env_int("FINGENIE_LLM_RPM"),
+            tokens_per_minute=env_int("FINGENIE_LLM_TPM"),
+            max_retries=env_int("FINGENIE_LLM_MAX_RETRIES", 5),
+        )
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "successes": self.successes,
+                "throttles": self.throttles,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+
+    def _acquire_slot(self):
+        """Waits for a free slot; returns True if this call fills the limit."""
+        with self._cond:
+            self.queue_depth += 1
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.queue_depth -= 1
+            self.in_flight += 1
+            return self.in_flight >= int(self.limit)
+
+    def _release_slot(self, throttled, saturated=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttles += 1
+                now = time.monotonic()
+                # Decrease at most once per cooldown window so one burst of
+                # throttles doesn't collapse the limit to the floor.
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self.successes += 1
+                # Only probe upwards when the current limit was actually in use
+                if saturated:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, tokens=1):
+        for attempt in range(self.max_retries + 1):
+            if self.request_bucket:
+                self.request_bucket.acquire(1)
+            if self.token_bucket:
+                self.token_bucket.acquire(tokens)
+            saturated = self._acquire_slot()
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self._release_slot(throttled, saturated)
+                if not throttled or attempt == self.max_retries:
+                    with self._cond:
+                        self.failures += 1
+                    raise
+                with self._cond:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt))
+                continue
+            self._release_slot(False, saturated)
+            return result
+
+
+class ControlledRunnable:
+    """Wraps a structured-output runnable so every invoke goes through the controller."""
+    def __init__(self, runnable, controller):
+        self.runnable = runnable
+        self.controller = controller
+
+    def invoke(self, messages, *args, **kwargs):
+        return self.controller.call(lambda: self.runnable.invoke(messages, *args, **kwargs),
+                                    tokens=estimate_tokens(messages))
+
+
+class ControlledLLM:
+    """Chat model proxy whose structured-output runnables share one controller."""
+    def __init__(self, llm, controller):
+        self.llm = llm
+        self.controller = controller
+
+    def with_structured_output(self, schema, **kwargs):
+        return ControlledRunnable(self.llm.with_structured_output(schema, **kwargs), self.controller)
+
+    def invoke(self, messages, *args, **kwargs):
+        return self.controller.call(lambda: self.llm.invoke(messages, *args, **kwargs),
+                                    tokens=estimate_tokens(messages))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def self_check():
+    """
+    Offline check of the controller against MockBedrockLLM's throttling:
+    idle (sequential) calls must not grow the limit, and a burst above the
+    mock's concurrency cap must shrink it while retries still complete every
+    call. Returns a list of failures (empty if all good).
+
+        python -m src.agents.concurrency
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .utils import MockBedrockLLM, ExtractedIDs
+
+    failures = []
+
+    idle = AdaptiveConcurrencyController(initial_limit=4)
+    runnable = ControlledLLM(MockBedrockLLM(), idle).with_structured_output(ExtractedIDs)
+    for _ in range(500):
+        runnable.invoke(["Analyze customer 123456"])
+    if idle.metrics()["concurrency_limit"] != 4:
+        failures.append(f"sequential calls grew the limit to {idle.metrics()['concurrency_limit']}")
+
+    burst = AdaptiveConcurrencyController(initial_limit=16, base_delay=0.005, max_delay=0.05,
+                                          max_retries=20, decrease_cooldown=0.0)
+    runnable = ControlledLLM(MockBedrockLLM(latency=0.005, max_concurrency=4), burst).with_structured_output(ExtractedIDs)
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(lambda _: runnable.invoke(["Analyze customer 123456"]), range(200)))
+    m = burst.metrics()
+    if not m["throttles"]:
+        failures.append("mock throttling never triggered")
+    if m["concurrency_limit"] >= 16:
+        failures.append(f"throttles did not shrink the limit ({m['concurrency_limit']})")
+    if m["failures"] or len(results) != 200 or any(r is None for r in results):
+        failures.append(f"retries did not complete every call: {m}")
+    print(f"idle: {idle.metrics()}\nburst: {m}")
+    return failures
+
+
+if __name__ == "__main__":
+    import sys
+    problems = self_check()
+    for problem in problems:
+        print(f"FAIL {problem}")
+    sys.exit(1 if problems else 0)
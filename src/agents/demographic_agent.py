@@ -1,5 +1,6 @@
 from .utils import SystemMessage, AIMessage
 from .utils import AgentState, get_llm, DemographicResponse
+from .columnar import pack_results
 
 col_names_mapping_customer = {
     "residence_since": "date since the customer is resident of UAE",
@@ -34,7 +35,7 @@ def demographic_agent(state: AgentState):
     
     if result and result.get("parsed"):
         return {
-            "demographic_results": result["parsed"].items,
+            "demographic_results": pack_results(result["parsed"].items, state),
             "sender": "demographic_agent"
         }
     
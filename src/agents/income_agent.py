@@ -1,5 +1,7 @@
 from .utils import SystemMessage, AIMessage
-from .utils import AgentState, get_llm, IncomeResponse
+from .utils import AgentState, get_llm, IncomeResponse, IncomeRow
+from .columnar import as_table, format_table, pack_results
+from .scoring import describe_scores
 
 col_names_mapping_income = {
     "cif_id_mask": "unique customer ID",
@@ -21,19 +23,39 @@ def income_agent(state: AgentState):
             "messages": [AIMessage(content="Income data missing")]
         }
 
+    # Precomputed consistency/affordability scores (scoring_node)
+    scores = as_table(state.get("income_scores"))
+    income_data = state["income_data"]
+    items = []
+
+    # With score_prefilter, only customers flagged needs_review go to the LLM;
+    # the rest get a deterministic summary of their scores.
+    if state.get("score_prefilter") and len(scores):
+        flagged = {cid for cid, review in zip(scores.customer_ids, scores.columns["needs_review"]) if review}
+        items = [IncomeRow(customer_id=cid, income_info=describe_scores(scores.row(cid)))
+                 for cid in scores.customer_ids if cid not in flagged]
+        income_data = income_data[income_data["cif_id_mask"].astype(str).isin(flagged)]
+        if income_data.empty:
+            return {
+                "income_results": pack_results(items, state),
+                "sender": "income_agent"
+            }
+
     system_prompt = SystemMessage(
-        content=f"Analyze income data: {state['income_data']}. Column mapping: {col_names_mapping_income}. Output ONLY IncomeResponse JSON."
+        content=f"Analyze income data: {income_data}. Column mapping: {col_names_mapping_income}. "
+                f"Precomputed scores per customer:\n{format_table(scores, income_data['cif_id_mask'].astype(str).unique())}\n"
+                f"Output ONLY IncomeResponse JSON."
     )
     
     result = formatter_llm_income.invoke([system_prompt])
     
     if result and result.get("parsed"):
         return {
-            "income_results": result["parsed"].items,
+            "income_results": pack_results(items + result["parsed"].items, state),
             "sender": "income_agent"
         }
     
     return {
-        "income_results": [],
+        "income_results": pack_results(items, state),
         "sender": "income_agent"
     }
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from .utils import SystemMessage
+
+# --- Prompt Prefix Caching ---
+# Static prompt text (e.g. the card catalog) is sent as its own prefix message,
+# rendered once per source file version. Bedrock models with prompt caching
+# get a cachePoint block after the prefix, so the backend processes it once;
+# other backends (incl. the Mock LLM) use ResponseCache, a local cache of
+# structured results keyed by (prefix digest, per-customer payload digest).
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+# Bedrock model families that accept cachePoint blocks
+PROMPT_CACHING_MODELS = ("anthropic.claude", "amazon.nova")
+DEFAULT_RESPONSE_CACHE_SIZE = 10_000
+
+
+def supports_prompt_caching(model_id=None):
+    """True if the backend (default: FINGENIE_MODEL_ID) supports Bedrock prompt caching."""
+    model_id = model_id or os.getenv("FINGENIE_MODEL_ID", "mock")
+    if os.getenv("FINGENIE_PROMPT_CACHING", "1") == "0":
+        return False
+    return any(family in model_id for family in PROMPT_CACHING_MODELS)
+
+
+def digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PromptPrefix:
+    """A static prompt segment and its digest."""
+    def __init__(self, text):
+        self.text = text
+        self.digest = digest(text)
+
+    def message(self, cache_point=False):
+        """SystemMessage for the prefix; with `cache_point`, marked cacheable for Bedrock."""
+        if cache_point:
+            return SystemMessage(content=[{"type": "text", "text": self.text}, CACHE_POINT])
+        return SystemMessage(content=self.text)
+
+
+_prefixes = {}
+_prefix_lock = threading.Lock()
+
+
+def file_prefix(path, render, missing_text):
+    """
+    Returns PromptPrefix(render(file text)), rebuilt only when the file's mtime
+    changes. If the file is missing, renders `missing_text` instead.
+    """
+    try:
+        stamp = os.path.getmtime(path)
+    except OSError:
+        return PromptPrefix(render(missing_text))
+    with _prefix_lock:
+        cached = _prefixes.get((path, render))
+        if cached is None or cached[0] != stamp:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = (stamp, PromptPrefix(render(f.read())))
+            _prefixes[(path, render)] = cached
+        return cached[1]
+
+
+class ResponseCache:
+    """Thread-safe LRU of structured results keyed by (prefix digest, payload digest)."""
+    def __init__(self, max_size=DEFAULT_RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Size from FINGENIE_PROMPT_CACHE_SIZE (0 disables the cache)."""
+        return cls(int(os.getenv("FINGENIE_PROMPT_CACHE_SIZE", DEFAULT_RESPONSE_CACHE_SIZE)))
+
+    def get(self, prefix, payload):
+        key = (prefix.digest, digest(payload))
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, prefix, payload, value):
+        if self.max_size <= 0:
+            return
+        key = (prefix.digest, digest(payload))
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
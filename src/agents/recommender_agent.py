@@ -1,42 +1,105 @@
-import os
-from .utils import SystemMessage, AIMessage
-from .utils import AgentState, get_llm, MultiCustomerRecommender
+from concurrent.futures import ThreadPoolExecutor
+from .utils import HumanMessage
+from .utils import AgentState, get_llm, get_controller, MultiCustomerRecommender
+from .columnar import as_table, format_table, pack_results
+from .segmentation import representatives, segment_members, expand_to_members
+from .prompt_cache import ResponseCache, file_prefix, supports_prompt_caching
+from src.data_paths import CARD_CATALOG
+
+# Upstream results included in each customer's context, by prompt section
+CONTEXT_SECTIONS = {
+    "DEMOGRAPHICS": "demographic_results",
+    "TRANSACTIONS": "transaction_results",
+    "INCOME": "income_results",
+    "CC HOLDINGS": "cc_holding_results",
+    "INCOME SCORES": "income_scores",
+}
+
+# Recommendations are also emitted on the graph's "custom" stream in chunks of
+# this many customers ({STREAM_CHUNK_KEY: [SingleCCAnalysis, ...]}), so the
+# exporter can write them while the rest of the cohort is still in flight.
+STREAM_CHUNK_KEY = "cc_results_chunk"
+STREAM_CHUNK_SIZE = 500
+
+# Local fallback when the backend has no prompt caching
+_responses = ResponseCache.from_env()
+
+def render_instructions(cc_cards):
+    """Static prompt prefix: the card catalog and task instructions (identical for every call)."""
+    return (
+        f"CC LIST: {cc_cards}\n"
+        f"Recommend max 3 credit cards for the customer described in the next message. "
+        f"Output ONLY MultiCustomerRecommender JSON."
+    )
+
+def customer_context(tables, customer_id):
+    """Per-customer payload: only this customer's rows from each upstream result."""
+    return "\n".join(f"{title}:\n{format_table(table, [customer_id])}" for title, table in tables.items())
+
+def _stream_writer():
+    """LangGraph custom-stream writer; a no-op outside a graph run."""
+    from langgraph.config import get_stream_writer
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda chunk: None
 
 def recommender_agent(state: AgentState):
     """
     Recommends credit cards based on analysis from other agents.
+    One call per customer: a shared, cacheable catalog prefix followed by that
+    customer's own upstream results.
     """
     llm = get_llm()
     formatter_llm_recommender = llm.with_structured_output(MultiCustomerRecommender, include_raw=True)
-    
-    # Read the text file for context (mocking the path relative to where script is run, usually root)
-    # We'll assume the Graph is run from project root, so data/credit_cards.txt
-    file_path_txt = "data/credit_cards.txt"
-    
-    try:
-        with open(file_path_txt, "r", encoding="utf-8") as f:
-            cc_cards = f.read()
-    except FileNotFoundError:
-        cc_cards = "Credit card list not found."
-
-    system_prompt = SystemMessage(content=f"""
-    DEMOGRAPHICS: {state.get('demographic_results', [])}
-    TRANSACTIONS: {state.get('transaction_results', [])}
-    INCOME: {state.get('income_results', [])}
-    CC HOLDINGS: {state.get('cc_holding_results', [])}
-    CC LIST: {cc_cards}
-    Recommend max 3 credit cards per customer. Output ONLY MultiCustomerRecommender JSON.
-    """)
-    
-    result = formatter_llm_recommender.invoke([system_prompt])
-    
-    if result and result.get("parsed"):
-        return {
-            "cc_results": result["parsed"].items,
-            "sender": "recommender_agent"
-        }
-    
+
+    prefix = file_prefix(CARD_CATALOG, render_instructions, "Credit card list not found.")
+    use_prompt_caching = supports_prompt_caching()
+    prefix_message = prefix.message(cache_point=use_prompt_caching)
+
+    tables = {title: as_table(state.get(key)) for title, key in CONTEXT_SECTIONS.items()}
+
+    # With segmentation, recommend for segment representatives only and broadcast
+    segment_map = state.get("segment_map")
+    if segment_map:
+        customer_ids = representatives(segment_map)
+    else:
+        customer_ids = list(dict.fromkeys(cid for table in tables.values() for cid in table.customer_ids))
+
+    def recommend(customer_id):
+        payload = customer_context(tables, customer_id)
+        if not use_prompt_caching:
+            cached = _responses.get(prefix, payload)
+            if cached is not None:
+                return [item.model_copy(deep=True) for item in cached]
+
+        result = formatter_llm_recommender.invoke([prefix_message, HumanMessage(content=payload)])
+        if not (result and result.get("parsed")):
+            return []
+        items = [item for item in result["parsed"].items if item.customer_id == customer_id]
+        # Empty results may be a transient bad parse; don't pin them in the cache
+        if items and not use_prompt_caching:
+            _responses.put(prefix, payload, items)
+        return items
+
+    members = segment_members(segment_map) if segment_map else None
+    write = _stream_writer()
+    items, chunk = [], []
+
+    # The shared controller bounds in-flight calls; the pool only needs to keep it busy
+    workers = max(1, min(len(customer_ids), get_controller().max_limit))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for customer_items in executor.map(recommend, customer_ids):
+            chunk.extend(expand_to_members(customer_items, members) if members else customer_items)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                write({STREAM_CHUNK_KEY: chunk})
+                items.extend(chunk)
+                chunk = []
+    if chunk:
+        write({STREAM_CHUNK_KEY: chunk})
+        items.extend(chunk)
+
     return {
-        "cc_results": [],
+        "cc_results": pack_results(items, state),
         "sender": "recommender_agent"
     }
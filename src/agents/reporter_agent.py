@@ -1,10 +1,8 @@
-from .utils import AgentState
+from .utils import AgentState, RESULT_KEYS
+from .columnar import as_table
 
-def reporter_agent(state: AgentState):
-    """Consolidates all analysis outputs into professional HTML report"""
-    
-    # Professional HTML template with Perplexity-inspired styling
-    html_template = """
+# Professional HTML template with Perplexity-inspired styling
+HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -145,95 +143,110 @@ def reporter_agent(state: AgentState):
     </div>
 </body>
 </html>
-    """.strip()
+""".strip()
+
+def result_tables(state):
+    """Returns the agent results of `state` as ResultTables keyed by state key."""
+    return {key: as_table(state.get(key)) for key in RESULT_KEYS}
 
-    customer_sections = []
+def render_customer_section(customer_id, tables):
+    """Renders one customer card from the result tables (see result_tables)."""
+    demographic_table = tables["demographic_results"]
+    trx_table = tables["transaction_results"]
+    income_table = tables["income_results"]
+    cc_holding_table = tables["cc_holding_results"]
+    cc_reco_table = tables["cc_results"]
+
+    demo_item = demographic_table.row(customer_id)
     
-    # Process each customer from demographic results (primary source)
-    for demo_item in state.get("demographic_results", []):
-        customer_id = getattr(demo_item, "customer_id", "UNKNOWN")
-        
-        # Find matching data across all analyses
-        def find_matching(item_list, customer_id):
-            return next((item for item in item_list or [] 
-                        if getattr(item, "customer_id", None) == customer_id), None)
-        
-        trx_analysis = find_matching(state.get("transaction_results", []), customer_id)
-        income_analysis = find_matching(state.get("income_results", []), customer_id)
-        cc_holdings = find_matching(state.get("cc_holding_results", []), customer_id)
-        cc_recos = find_matching(state.get("cc_results", []), customer_id)
+    # Find matching data across all analyses (indexed by customer_id)
+    income_analysis = income_table.row(customer_id)
+    cc_holdings = cc_holding_table.row(customer_id)
+    profiles = trx_table.child_rows("profiles", customer_id)
+    recos = cc_reco_table.child_rows("cc_summary", customer_id)
+    
+    # Behavioral Profiles Section
+    profiles_html = '<div class="no-data">No behavioral profiles identified</div>'
+    if profiles:
+        profiles_html = '<div class="profile-grid">'
+        for profile in profiles:
+            profiles_html += f'''
+            <div class="profile-item">
+                <div class="profile-name">{profile.get("profile_name", "Unnamed")}</div>
+                <div class="profile-reason">{profile.get("reason", "No reason provided")}</div>
+            </div>
+            '''
+        profiles_html += '</div>'
+    
+    # Credit Card Recommendations
+    recos_html = '<div class="no-data">No credit card recommendations</div>'
+    if recos:
+        recos_html = '<div class="profile-grid">'
+        for reco in recos:
+            recos_html += f'''
+            <div class="reco-item">
+                <div class="reco-card">{reco.get("cc_recommended", "Unnamed Card")}</div>
+                <div class="reco-reason">{reco.get("recommended_reasons", "No reason provided")}</div>
+            </div>
+            '''
+        recos_html += '</div>'
+    
+    # Build customer section
+    customer_section = f'''
+    <div class="customer-card">
+        <div class="customer-header">
+            <div class="customer-id">ID: {customer_id}</div>
+        </div>
         
-        # Behavioral Profiles Section
-        profiles_html = '<div class="no-data">No behavioral profiles identified</div>'
-        if trx_analysis and hasattr(trx_analysis, 'profiles') and trx_analysis.profiles:
-            profiles_html = '<div class="profile-grid">'
-            for profile in trx_analysis.profiles:
-                profiles_html += f'''
-                <div class="profile-item">
-                    <div class="profile-name">{getattr(profile, "profile_name", "Unnamed")}</div>
-                    <div class="profile-reason">{getattr(profile, "reason", "No reason provided")}</div>
-                </div>
-                '''
-            profiles_html += '</div>'
+        <div class="section">
+            <div class="section-title">📊 Demographic Summary</div>
+            <div class="summary-text">{demo_item.get("summary", "No demographic data")}</div>
+        </div>
         
-        # Credit Card Recommendations
-        recos_html = '<div class="no-data">No credit card recommendations</div>'
-        if cc_recos and hasattr(cc_recos, 'cc_summary') and cc_recos.cc_summary:
-            recos_html = '<div class="profile-grid">'
-            for reco in cc_recos.cc_summary:
-                recos_html += f'''
-                <div class="reco-item">
-                    <div class="reco-card">{getattr(reco, "cc_recommended", "Unnamed Card")}</div>
-                    <div class="reco-reason">{getattr(reco, "recommended_reasons", "No reason provided")}</div>
-                </div>
-                '''
-            recos_html += '</div>'
+        <div class="section">
+            <div class="section-title">💳 Behavioral Profiles</div>
+            {profiles_html}
+        </div>
         
-        # Build customer section
-        customer_section = f'''
-        <div class="customer-card">
-            <div class="customer-header">
-                <div class="customer-id">ID: {customer_id}</div>
+        <div class="section">
+            <div class="section-title">💰 Income Analysis</div>
+            <div class="summary-text">
+                {income_analysis.get("income_info", "No income data available") if income_analysis else "No income data"}
             </div>
-            
-            <div class="section">
-                <div class="section-title">📊 Demographic Summary</div>
-                <div class="summary-text">{getattr(demo_item, "summary", "No demographic data")}</div>
-            </div>
-            
-            <div class="section">
-                <div class="section-title">💳 Behavioral Profiles</div>
-                {profiles_html}
-            </div>
-            
-            <div class="section">
-                <div class="section-title">💰 Income Analysis</div>
-                <div class="summary-text">
-                    {getattr(income_analysis, "income_info", "No income data available") if income_analysis else "No income data"}
-                </div>
-            </div>
-            
-            <div class="section">
-                <div class="section-title">🏦 Current Credit Cards</div>
-                <div class="summary-text">
-                    {getattr(cc_holdings, "cc_holding_info", "No CC holdings") if cc_holdings else "No CC holdings data"}
-                </div>
-            </div>
-            
-            <div class="section">
-                <div class="section-title">🎯 Recommended Credit Cards</div>
-                {recos_html}
+        </div>
+        
+        <div class="section">
+            <div class="section-title">🏦 Current Credit Cards</div>
+            <div class="summary-text">
+                {cc_holdings.get("cc_holding_info", "No CC holdings") if cc_holdings else "No CC holdings data"}
             </div>
         </div>
-        '''
         
-        customer_sections.append(customer_section)
-    
+        <div class="section">
+            <div class="section-title">🎯 Recommended Credit Cards</div>
+            {recos_html}
+        </div>
+    </div>
+    '''
+    return customer_section
+
+def render_report(customer_sections):
+    """Wraps rendered customer cards in the report page."""
     # Handle empty results
     if not customer_sections:
-        customer_sections.append('<div class="no-data">No customer data available for analysis</div>')
-    
-    final_html = html_template.format(customer_sections=''.join(customer_sections))
+        customer_sections = ['<div class="no-data">No customer data available for analysis</div>']
+    return HTML_TEMPLATE.format(customer_sections=''.join(customer_sections))
+
+def reporter_agent(state: AgentState):
+    """Consolidates all analysis outputs into professional HTML report"""
+    tables = result_tables(state)
+
+    # Process each customer from demographic results (primary source)
+    customer_sections = [
+        render_customer_section(customer_id, tables)
+        for customer_id in tables["demographic_results"].customer_ids
+    ]
+    final_html = render_report(customer_sections)
     
     return {
         "final_table": final_html,
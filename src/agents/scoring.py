@@ -0,0 +1,129 @@
+import argparse
+
+import numpy as np
+
+from .utils import AgentState
+from .columnar import ResultTable
+
+# --- Income Consistency & Affordability Scoring ---
+# One vectorized pass over income_hackathon joined with cc_master. Produces
+# structured fields for the income and recommender agents and flags which
+# customers actually need LLM analysis.
+
+MISMATCH_THRESHOLD = 0.2      # |calculated - declared| / declared
+HIGH_LIMIT_TO_INCOME = 3.0    # total open limit / reference monthly income
+
+# Source columns score_income() reads
+INCOME_COLUMNS = ["cif_id_mask", "income_kyc", "income_cust"]
+CC_COLUMNS = ["cif_id_mask", "cc_credit_limit", "cc_account_closed_date"]
+
+SCORE_COLUMNS = [
+    "income_kyc", "income_cust", "income_delta", "income_delta_pct",
+    "total_limit", "n_open_cards", "limit_to_income", "income_mismatch", "needs_review",
+]
+
+
+def score_income(income_data, cc_holding_data, mismatch_threshold=MISMATCH_THRESHOLD,
+                 high_limit_to_income=HIGH_LIMIT_TO_INCOME):
+    """
+    Returns one row per customer (index: cif_id_mask as str) with SCORE_COLUMNS.
+    Exposure only counts cards without a closed date. The reference income for
+    limit_to_income is the calculated income, falling back to the declared one.
+    """
+    key = "cif_id_mask"
+    # Aggregate on the native key dtype first, stringify the (smaller) result
+    income = income_data.groupby(key, sort=False)[["income_kyc", "income_cust"]].max()
+
+    if cc_holding_data is not None and not cc_holding_data.empty:
+        cc = cc_holding_data
+        if "cc_account_closed_date" in cc.columns:
+            cc = cc[cc["cc_account_closed_date"].isna()]
+        exposure = cc.groupby(key, sort=False)["cc_credit_limit"].agg(total_limit="sum", n_open_cards="size")
+        scores = income.join(exposure, how="outer")
+    else:
+        scores = income.assign(total_limit=np.nan, n_open_cards=np.nan)
+
+    scores.index = scores.index.astype(str)
+    scores = scores[~scores.index.duplicated()]
+    scores[["total_limit", "n_open_cards"]] = scores[["total_limit", "n_open_cards"]].fillna(0)
+
+    kyc = scores["income_kyc"].to_numpy(dtype=np.float64)
+    cust = scores["income_cust"].to_numpy(dtype=np.float64)
+    limit = scores["total_limit"].to_numpy(dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = cust - kyc
+        delta_pct = np.where(kyc > 0, delta / kyc, np.nan)
+        reference = np.where(cust > 0, cust, kyc)
+        limit_to_income = np.where(reference > 0, limit / reference, np.nan)
+
+    scores["income_delta"] = delta
+    scores["income_delta_pct"] = delta_pct
+    scores["limit_to_income"] = limit_to_income
+    scores["income_mismatch"] = np.abs(np.nan_to_num(delta_pct, nan=np.inf)) > mismatch_threshold
+    scores["needs_review"] = scores["income_mismatch"].to_numpy() | (np.nan_to_num(limit_to_income, nan=np.inf) > high_limit_to_income)
+    scores["n_open_cards"] = scores["n_open_cards"].astype(np.int64)
+    return scores[SCORE_COLUMNS]
+
+
+def scores_table(scores):
+    """Converts score_income() output to a ResultTable for state."""
+    columns = {"customer_id": scores.index.tolist()}
+    columns.update({c: scores[c].round(4).tolist() if scores[c].dtype.kind == "f" else scores[c].tolist()
+                    for c in SCORE_COLUMNS})
+    return ResultTable(columns=columns)
+
+
+def describe_scores(row):
+    """Deterministic income_info text for customers that skip the LLM."""
+    delta_pct = row.get("income_delta_pct")
+    delta = "n/a" if delta_pct is None or np.isnan(delta_pct) else f"{delta_pct:+.0%}"
+    return (f"Declared: AED {row.get('income_kyc', 0):,.0f}, Calculated: AED {row.get('income_cust', 0):,.0f} "
+            f"(delta {delta}); total open limit AED {row.get('total_limit', 0):,.0f} "
+            f"across {row.get('n_open_cards', 0)} card(s), {row.get('limit_to_income', 0):.1f}x income")
+
+
+def scoring_node(state: AgentState):
+    """Scores the filtered cohort and stores the result in state['income_scores']."""
+    income_data = state.get("income_data")
+    if income_data is None or income_data.empty:
+        return {"income_scores": ResultTable(columns={"customer_id": []}), "sender": "scoring_node"}
+    scores = score_income(income_data, state.get("cc_holding_data"))
+    return {"income_scores": scores_table(scores), "sender": "scoring_node"}
+
+
+def read_sources():
+    """Reads only the income and card master columns needed for scoring (not the full load_data())."""
+    import pandas as pd
+    from src.data_paths import DATA_FILES
+
+    def read(path, columns):
+        # A callable usecols tolerates optional columns (e.g. no closed date)
+        wanted = set(columns)
+        if path.endswith(".csv"):
+            return pd.read_csv(path, usecols=lambda c: c in wanted)
+        return pd.read_excel(path, usecols=lambda c: c in wanted)
+
+    return read(DATA_FILES["income_data"], INCOME_COLUMNS), read(DATA_FILES["cc_holding_data"], CC_COLUMNS)
+
+
+def main(argv=None):
+    """Screens the full book: python -m src.agents.scoring --out scores.csv"""
+
+    parser = argparse.ArgumentParser(description="Vectorized income consistency and affordability scoring.")
+    parser.add_argument("--out", default="income_scores.csv", help="Output file (.csv or .parquet)")
+    parser.add_argument("--mismatch-threshold", type=float, default=MISMATCH_THRESHOLD)
+    parser.add_argument("--high-limit-to-income", type=float, default=HIGH_LIMIT_TO_INCOME)
+    args = parser.parse_args(argv)
+
+    income_data, cc_holding_data = read_sources()
+    scores = score_income(income_data, cc_holding_data, args.mismatch_threshold, args.high_limit_to_income)
+    if args.out.endswith(".parquet"):
+        scores.to_parquet(args.out)
+    else:
+        scores.to_csv(args.out, index_label="cif_id_mask")
+    print(f"Scored {len(scores):,} customers, {int(scores['needs_review'].sum()):,} need review -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from langchain_core.messages import AIMessage
+
+from .utils import AgentState
+
+# --- Customer Segmentation Pre-Pass ---
+# Clusters the cohort on spend/income/limit/tenure/dependents features so the
+# LLM agents only analyze one representative per segment and broadcast the
+# result to its members. Customers further than the distance threshold from
+# their segment centre are kept as their own representative (individual call).
+# The threshold is an RMS distance per standardized feature (Euclidean distance
+# / sqrt(n_features)), so it means the same whatever the number of features.
+
+DEFAULT_DISTANCE_THRESHOLD = 1.0
+MAX_MCC_FEATURES = 20
+
+
+def build_features(trx_data, income_data, cc_holding_data, demographic_data):
+    """
+    Returns (customer_ids, standardized feature matrix, feature names), one row
+    per customer seen in any of the frames.
+    """
+    frames = [f for f in (trx_data, income_data, cc_holding_data, demographic_data) if f is not None and not f.empty]
+    if not frames:
+        return np.array([], dtype=object), np.empty((0, 0)), []
+    ids = pd.Index(pd.concat([f["cif_id_mask"].astype(str) for f in frames]).unique())
+    features = pd.DataFrame(index=ids)
+
+    # MCC spend shares (outflows), top MCCs by spend plus "other"
+    if trx_data is not None and not trx_data.empty:
+        outflow = trx_data[trx_data["in_out_flow"].astype(str).str.lower() == "outflow"]
+        spend = outflow.pivot_table(index=outflow["cif_id_mask"].astype(str), columns="mcc_code",
+                                    values="amount", aggfunc="sum", fill_value=0.0)
+        if not spend.empty:
+            top = spend.sum().nlargest(MAX_MCC_FEATURES).index
+            shares = spend[top].copy()
+            shares["other"] = spend.drop(columns=top).sum(axis=1)
+            shares = shares.div(spend.sum(axis=1).replace(0, np.nan), axis=0).fillna(0.0)
+            shares.columns = [f"mcc_share_{c}" for c in shares.columns]
+            features = features.join(shares)
+
+    if income_data is not None and not income_data.empty:
+        income = income_data.assign(cif_id_mask=income_data["cif_id_mask"].astype(str)).groupby("cif_id_mask")
+        features["log_income_cust"] = np.log1p(income["income_cust"].max().clip(lower=0))
+        features["log_income_kyc"] = np.log1p(income["income_kyc"].max().clip(lower=0))
+
+    if cc_holding_data is not None and not cc_holding_data.empty:
+        cc = cc_holding_data.assign(cif_id_mask=cc_holding_data["cif_id_mask"].astype(str)).groupby("cif_id_mask")
+        features["log_total_limit"] = np.log1p(cc["cc_credit_limit"].sum().clip(lower=0))
+        features["n_cards"] = cc.size()
+
+    if demographic_data is not None and not demographic_data.empty:
+        demo = demographic_data.assign(cif_id_mask=demographic_data["cif_id_mask"].astype(str)).drop_duplicates("cif_id_mask").set_index("cif_id_mask")
+        start = pd.to_datetime(demo["relationship_start_date"], errors="coerce")
+        features["tenure_years"] = (pd.Timestamp.now() - start).dt.days / 365.25
+        features["dependents"] = pd.to_numeric(demo["dependents"], errors="coerce")
+
+    # Shares default to 0, everything else to the column median
+    share_cols = [c for c in features.columns if c.startswith("mcc_share_")]
+    features[share_cols] = features[share_cols].fillna(0.0)
+    features = features.fillna(features.median()).fillna(0.0)
+
+    X = features.to_numpy(dtype=np.float64)
+    std = X.std(axis=0)
+    X = (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0)
+    return ids.to_numpy(), X, list(features.columns)
+
+
+def _sq_distances(X, centers, chunk_size=65536):
+    """Squared Euclidean distance from each row to its nearest centre, computed in chunks."""
+    labels = np.empty(len(X), dtype=np.int64)
+    dists = np.empty(len(X), dtype=np.float64)
+    center_norms = (centers ** 2).sum(axis=1)
+    for start in range(0, len(X), chunk_size):
+        block = X[start:start + chunk_size]
+        d = (block ** 2).sum(axis=1)[:, None] - 2 * block @ centers.T + center_norms[None, :]
+        labels[start:start + chunk_size] = d.argmin(axis=1)
+        dists[start:start + chunk_size] = np.maximum(d.min(axis=1), 0.0)
+    return labels, dists
+
+
+def minibatch_kmeans(X, n_clusters, batch_size=1024, n_iter=100, seed=0):
+    """
+    Mini-batch k-means (Sculley 2010) with k-means++ seeding on a sample.
+    Returns (centers, labels, distances to assigned centre).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    k = min(n_clusters, n)
+
+    # k-means++ seeding on a bounded sample
+    sample = X[rng.choice(n, size=min(n, max(10 * k, batch_size)), replace=False)]
+    centers = [sample[rng.integers(len(sample))]]
+    closest = ((sample - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        idx = rng.choice(len(sample), p=closest / total) if total > 0 else rng.integers(len(sample))
+        centers.append(sample[idx])
+        closest = np.minimum(closest, ((sample - sample[idx]) ** 2).sum(axis=1))
+    centers = np.array(centers, dtype=np.float64)
+
+    counts = np.zeros(k)
+    for _ in range(n_iter):
+        batch = X[rng.choice(n, size=min(batch_size, n), replace=False)]
+        labels, _ = _sq_distances(batch, centers)
+        batch_counts = np.bincount(labels, minlength=k).astype(np.float64)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, batch)
+        hit = batch_counts > 0
+        counts[hit] += batch_counts[hit]
+        # Per-centre learning rate = batch members / all members seen so far
+        eta = (batch_counts[hit] / counts[hit])[:, None]
+        centers[hit] = (1 - eta) * centers[hit] + eta * (sums[hit] / batch_counts[hit][:, None])
+
+    labels, sq_dists = _sq_distances(X, centers)
+    return centers, labels, np.sqrt(sq_dists)
+
+
+def segment_customers(trx_data, income_data, cc_holding_data, demographic_data,
+                      n_segments, distance_threshold=DEFAULT_DISTANCE_THRESHOLD, seed=0):
+    """
+    Returns {customer_id: representative_customer_id}. The representative of a
+    segment is the member closest to its centre; members whose RMS distance
+    per feature exceeds `distance_threshold` represent themselves.
+    """
+    ids, X, _ = build_features(trx_data, income_data, cc_holding_data, demographic_data)
+    if len(ids) == 0:
+        return {}
+    _, labels, dists = minibatch_kmeans(X, n_segments, seed=seed)
+    dists = dists / np.sqrt(max(X.shape[1], 1))
+
+    # Closest member per label: sort by (label, distance) and take the first of each label
+    order = np.lexsort((dists, labels))
+    first = np.unique(labels[order], return_index=True)[1]
+    rep_by_label = np.empty(labels.max() + 1, dtype=object)
+    rep_by_label[labels[order][first]] = ids[order][first]
+
+    reps = rep_by_label[labels]
+    outliers = dists > distance_threshold
+    reps[outliers] = ids[outliers]
+    return dict(zip(ids.tolist(), reps.tolist()))
+
+
+def representatives(segment_map):
+    """Unique representative IDs, in first-seen order."""
+    return list(dict.fromkeys(segment_map.values()))
+
+
+def segment_members(segment_map):
+    """{representative: [member IDs]} (the representative is a member of its own segment)."""
+    members = {}
+    for cid, rep in segment_map.items():
+        members.setdefault(rep, []).append(cid)
+    return members
+
+
+def expand_to_members(items, members):
+    """Like broadcast(), for a subset of representatives' items given segment_members()."""
+    return [item if cid == item.customer_id else item.model_copy(update={"customer_id": cid}, deep=True)
+            for item in items for cid in members.get(item.customer_id, ())]
+
+
+def broadcast(items, segment_map):
+    """Copies each representative's result row to every member of its segment."""
+    by_rep = {item.customer_id: item for item in items}
+    out = []
+    for cid, rep in segment_map.items():
+        item = by_rep.get(rep)
+        if item is not None:
+            out.append(item if cid == rep else item.model_copy(update={"customer_id": cid}, deep=True))
+    return out
+
+
+def segmentation_node(state: AgentState):
+    """
+    Optional pre-pass: when state['n_segments'] is set, clusters the filtered
+    cohort and stores the customer -> representative map in state['segment_map'].
+    """
+    n_segments = state.get("n_segments")
+    if not n_segments:
+        return {"segment_map": {}, "sender": "segmentation_node"}
+
+    segment_map = segment_customers(
+        state.get("trx_data"), state.get("income_data"), state.get("cc_holding_data"), state.get("demographic_data"),
+        n_segments=n_segments,
+        distance_threshold=state.get("segment_distance_threshold") or DEFAULT_DISTANCE_THRESHOLD,
+    )
+    n_reps = len(representatives(segment_map))
+    return {
+        "segment_map": segment_map,
+        "sender": "segmentation_node",
+        "messages": [AIMessage(content=f"Segmented {len(segment_map)} customers into {n_reps} LLM calls")],
+    }
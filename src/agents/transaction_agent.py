@@ -1,5 +1,7 @@
 from .utils import SystemMessage, AIMessage, RunnableConfig
 from .utils import AgentState, get_llm, MultiCustomerAnalysis
+from .columnar import pack_results
+from .segmentation import representatives, broadcast
 
 def transaction_agent(state: AgentState):
     """
@@ -16,9 +18,15 @@ def transaction_agent(state: AgentState):
             "messages": [AIMessage(content="Transaction data missing")]
         }
 
+    # With segmentation, only segment representatives go to the LLM
+    trx_data = state["trx_data"]
+    segment_map = state.get("segment_map")
+    if segment_map:
+        trx_data = trx_data[trx_data["cif_id_mask"].astype(str).isin(representatives(segment_map))]
+
     # Construct prompt
     system_prompt = SystemMessage(
-        content=f"Analyze transaction data: {state['trx_data']}. Assign up to 3 profiles per customer. Output ONLY MultiCustomerAnalysis JSON."
+        content=f"Analyze transaction data: {trx_data}. Assign up to 3 profiles per customer. Output ONLY MultiCustomerAnalysis JSON."
     )
     
     # Invoke Mock LLM
@@ -26,8 +34,11 @@ def transaction_agent(state: AgentState):
     result = formatter_llm_trx.invoke([system_prompt])
     
     if result and result.get("parsed"):
+        items = result["parsed"].items
+        if segment_map:
+            items = broadcast(items, segment_map)
         return {
-            "transaction_results": result["parsed"].items,
+            "transaction_results": pack_results(items, state),
             "sender": "transaction_agent"
         }
     
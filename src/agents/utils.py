@@ -1,16 +1,28 @@
 from typing import Annotated, List, TypedDict, Optional, Any, Dict
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
-from langchain_core.messages import BaseMessage, AIMessage, SystemMessage
+from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
 import pandas as pd
 import json
+import os
+import random
+import threading
+import time
+from .concurrency import AdaptiveConcurrencyController, ControlledLLM, ThrottlingError
 
 # --- Shared State ---
 # Using standard Annotated for add_messages reducer
 class AgentState(TypedDict):
-    target_cifs: Optional[List[str]]
+    target_cifs: Optional[Any]  # list of customer IDs or path to an ID file
+    unknown_cifs: List[str]
+    result_format: Optional[str]  # "models" (default) or "columnar"
+    n_segments: Optional[int]  # enables the segmentation pre-pass
+    segment_distance_threshold: Optional[float]
+    segment_map: Dict[str, str]  # customer_id -> representative customer_id
+    income_scores: Any  # ResultTable from scoring_node
+    score_prefilter: Optional[bool]  # only send customers flagged needs_review to the income LLM
     messages: Annotated[List[BaseMessage], add_messages]
     trx_data: pd.DataFrame
     demographic_data: pd.DataFrame
@@ -72,6 +84,31 @@ class MultiCustomerRecommender(BaseModel):
 class ExtractedIDs(BaseModel):
     customer_ids: List[str]
 
+# Row model per result key in AgentState, used to convert columnar results
+# back to pydantic objects at the API boundary.
+RESULT_SCHEMAS = {
+    "demographic_results": DemographicRow,
+    "transaction_results": SingleCustomerAnalysis,
+    "income_results": IncomeRow,
+    "cc_holding_results": CCHoldingRow,
+    "cc_results": SingleCCAnalysis,
+}
+RESULT_KEYS = tuple(RESULT_SCHEMAS)
+
+def results_as_models(state):
+    """
+    API boundary: returns {result key: list of pydantic rows} for the results in
+    `state`, converting columnar ResultTables back with RESULT_SCHEMAS.
+    """
+    from .columnar import ResultTable
+
+    results = {}
+    for key, schema in RESULT_SCHEMAS.items():
+        value = state.get(key)
+        if value is not None:
+            results[key] = value.to_models(schema) if isinstance(value, ResultTable) else list(value)
+    return results
+
 # --- Mock LLM (Still kept as user specifically didn't provide AWS creds) ---
 # If they provide creds, we can switch get_llm to return ChatBedrockConverse
 
@@ -79,22 +116,52 @@ class MockBedrockLLM:
     """
     A mock LLM wrapper that behaves like a LangChain ChatModel or wrapper
     specifically for this workflow's structured output needs.
+
+    Can emulate Bedrock throttling for offline testing of the concurrency
+    controller: `throttle_rate` throttles a random fraction of calls and
+    `max_concurrency` throttles any call beyond that many in flight.
+    `latency` adds a fixed delay (seconds) per call.
     """
-    def __init__(self, model_id="mock-model", model_kwargs=None):
+    _in_flight = 0
+    _lock = threading.Lock()
+
+    def __init__(self, model_id="mock-model", model_kwargs=None, latency=0.0, throttle_rate=0.0, max_concurrency=None):
         self.model_id = model_id
         self.model_kwargs = model_kwargs or {}
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.max_concurrency = max_concurrency
     
     def with_structured_output(self, schema: BaseModel, include_raw=False):
-        return MockStructuredOutputRunnable(schema)
+        return MockStructuredOutputRunnable(schema, self)
         
     def invoke(self, messages):
+        self._simulate_call()
         return AIMessage(content="Mock LLM response")
 
+    def _simulate_call(self):
+        with MockBedrockLLM._lock:
+            MockBedrockLLM._in_flight += 1
+            in_flight = MockBedrockLLM._in_flight
+        try:
+            if self.max_concurrency is not None and in_flight > self.max_concurrency:
+                raise ThrottlingError("ThrottlingException: Too many concurrent requests")
+            if self.throttle_rate and random.random() < self.throttle_rate:
+                raise ThrottlingError("ThrottlingException: Rate exceeded")
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with MockBedrockLLM._lock:
+                MockBedrockLLM._in_flight -= 1
+
 class MockStructuredOutputRunnable:
-    def __init__(self, schema):
+    def __init__(self, schema, llm=None):
         self.schema = schema
+        self.llm = llm
     
     def invoke(self, messages):
+        if self.llm is not None:
+            self.llm._simulate_call()
         # Extract data from messages
         import re
         message_str = str(messages)
@@ -200,8 +267,50 @@ class MockStructuredOutputRunnable:
             return "Visa Signature (Limit: AED 75k)"
         return f"Credit card data for {cid}"
 
+_controller = None
+_controller_lock = threading.Lock()
+
+def get_controller():
+    """Returns the process-wide LLM concurrency controller (configured from env on first use)."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdaptiveConcurrencyController.from_env()
+        return _controller
+
+def set_controller(controller):
+    """Replaces the shared controller (e.g. with custom limits in tests)."""
+    global _controller
+    with _controller_lock:
+        _controller = controller
+
+_bedrock_clients = {}
+
+def _get_bedrock_llm(model_id):
+    """Builds (once per model) the real Bedrock chat model. langchain_aws/boto3 are only imported here."""
+    with _controller_lock:
+        if model_id not in _bedrock_clients:
+            from langchain_aws import ChatBedrockConverse
+            _bedrock_clients[model_id] = ChatBedrockConverse(
+                model=model_id,
+                region_name=os.getenv("AWS_REGION", "us-east-1"),
+            )
+        return _bedrock_clients[model_id]
+
 def get_llm():
-    """Returns a Mock LLM instance."""
-    return MockBedrockLLM()
+    """
+    Returns the LLM selected by FINGENIE_MODEL_ID (default: Mock LLM).
+    Calls go through the shared concurrency controller.
+    """
+    model_id = os.getenv("FINGENIE_MODEL_ID", "mock")
+    if model_id != "mock":
+        return ControlledLLM(_get_bedrock_llm(model_id), get_controller())
+
+    llm = MockBedrockLLM(
+        latency=float(os.getenv("FINGENIE_MOCK_LATENCY", 0)),
+        throttle_rate=float(os.getenv("FINGENIE_MOCK_THROTTLE_RATE", 0)),
+        max_concurrency=int(os.environ["FINGENIE_MOCK_MAX_CONCURRENCY"]) if os.getenv("FINGENIE_MOCK_MAX_CONCURRENCY") else None,
+    )
+    return ControlledLLM(llm, get_controller())
 
 # Mock StateGraph REMOVED as we use real Library now
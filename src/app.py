@@ -1,16 +1,15 @@
 import streamlit as st
 import os
 import sys
-import time
-import pandas as pd
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-# Import Graph Elements (Real LangGraph)
-from langgraph.graph import START, END
-from src.agents.utils import AgentState
-from src.graph import filter_node, transaction_agent, demographic_agent, income_agent, cc_holding_agent, recommender_agent, reporter_agent, StateGraph, MemorySaver
+# src.graph is cheap to import: langgraph, pandas and the agents load on first build_graph()
+from src.graph import NODE_ORDER, build_graph
+
+PAGE_SIZES = [10, 25, 50]
+MAX_SEARCH_MATCHES = 500
 
 # Config
 st.set_page_config(page_title="FinGenie Customer Analysis", layout="wide")
@@ -26,32 +25,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def build_graph():
-    workflow = StateGraph(state_schema=AgentState)
-    workflow.add_node("filter_node", filter_node)
-    workflow.add_node("transaction_agent", transaction_agent)
-    workflow.add_node("demographic_agent", demographic_agent)
-    workflow.add_node("income_agent", income_agent)
-    workflow.add_node("cc_holding_agent", cc_holding_agent)
-    workflow.add_node("recommender_agent", recommender_agent)
-    workflow.add_node("reporter_agent", reporter_agent)
-    
-    workflow.add_edge(START, "filter_node")
-    workflow.add_edge("filter_node", "transaction_agent")
-    workflow.add_edge("transaction_agent", "demographic_agent")
-    workflow.add_edge("demographic_agent", "income_agent")
-    workflow.add_edge("income_agent", "cc_holding_agent")
-    workflow.add_edge("cc_holding_agent", "recommender_agent")
-    workflow.add_edge("recommender_agent", "reporter_agent")
-    workflow.add_edge("reporter_agent", END)
-    
-    return workflow.compile()
-
 def render_agent_status(status_placeholder, current_node, completed_nodes):
-    agents = [
-        "filter_node", "transaction_agent", "demographic_agent", 
-        "income_agent", "cc_holding_agent", "recommender_agent", "reporter_agent"
-    ]
+    agents = NODE_ORDER
     
     with status_placeholder.container():
         st.subheader("Agent Activation State")
@@ -63,6 +38,104 @@ def render_agent_status(status_placeholder, current_node, completed_nodes):
             else:
                 st.markdown(f'<div class="agent-box agent-pending">○ {agent}</div>', unsafe_allow_html=True)
 
+@st.cache_resource
+def get_app():
+    """Compiled graph, built once per server process."""
+    return build_graph()
+
+
+def summarize_update(updates):
+    """Compact, JSON-friendly view of a node update (no DataFrames or full HTML)."""
+    if not isinstance(updates, dict):
+        return str(updates)[:200]
+    summary = {}
+    for key, value in updates.items():
+        if hasattr(value, "shape"):
+            summary[key] = f"DataFrame: {value.shape[0]} rows x {value.shape[1]} columns"
+        elif key == "messages":
+            summary[key] = [getattr(m, "content", str(m))[:200] for m in value]
+        elif isinstance(value, str):
+            summary[key] = value if len(value) <= 200 else f"{len(value):,} characters"
+        elif hasattr(value, "__len__"):
+            summary[key] = f"{len(value)} items"
+        else:
+            summary[key] = str(value)[:200]
+    return summary
+
+def run_analysis(customer_ids, status_placeholder, log_container):
+    """Streams the graph and stores result tables and log summaries in session state."""
+    from src.agents.reporter_agent import result_tables
+
+    app = get_app()
+    completed_nodes = []
+    full_state = {}
+    logs = []
+
+    thread = {"configurable": {"thread_id": "streamlit-1"}}
+    from src.cif_input import split_ids
+
+    target_cifs = split_ids(customer_ids)
+    inputs = {
+        "messages": [("human", f"Analyze customers: {', '.join(target_cifs)}")],
+        "target_cifs": target_cifs,
+        "result_format": "columnar",
+    }
+
+    # In 'updates' mode each event is {node_name: {updated_state_keys: values}}
+    for event in app.stream(inputs, thread, stream_mode="updates"):
+        for node_name, updates in event.items():
+            completed_nodes.append(node_name)
+            render_agent_status(status_placeholder, node_name, completed_nodes)
+            if isinstance(updates, dict):
+                full_state.update(updates)
+
+            summary = summarize_update(updates)
+            logs.append((node_name, summary))
+            with log_container:
+                with st.expander(f"Output from {node_name}", expanded=False):
+                    st.json(summary)
+
+    render_agent_status(status_placeholder, "DONE", completed_nodes)
+
+    tables = result_tables(full_state)
+    st.session_state["results"] = {
+        "tables": tables,
+        "customer_ids": tables["demographic_results"].customer_ids,
+        "final_table": full_state.get("final_table"),
+        "unknown_cifs": full_state.get("unknown_cifs") or [],
+        "logs": logs,
+    }
+
+def render_customer_lookup(results):
+    from src.agents.reporter_agent import render_customer_section, render_report
+
+    customer_ids = results["customer_ids"]
+    query = st.text_input("Search customer ID", key="customer_query").strip()
+    matches = [cid for cid in customer_ids if query in cid] if query else customer_ids
+    st.caption(f"{len(matches):,} of {len(customer_ids):,} customers match")
+    if not matches:
+        return
+    selected = st.selectbox("Customer", matches[:MAX_SEARCH_MATCHES], key="customer_selected")
+    st.components.v1.html(render_report([render_customer_section(selected, results["tables"])]),
+                          height=800, scrolling=True)
+
+def render_report_pages(results):
+    from src.agents.reporter_agent import render_customer_section, render_report
+
+    customer_ids = results["customer_ids"]
+    col_size, col_page = st.columns(2)
+    page_size = col_size.selectbox("Customers per page", PAGE_SIZES, key="page_size")
+    n_pages = max(1, -(-len(customer_ids) // page_size))
+    page = col_page.number_input(f"Page (1-{n_pages})", min_value=1, max_value=n_pages, value=1, key="page")
+
+    page_ids = customer_ids[(page - 1) * page_size:page * page_size]
+    sections = [render_customer_section(cid, results["tables"]) for cid in page_ids]
+    st.components.v1.html(render_report(sections), height=800, scrolling=True)
+
+    if results["final_table"]:
+        st.download_button("Download full HTML report", results["final_table"],
+                           file_name="customer_analysis_report.html", mime="text/html")
+
 def main():
     st.title("💸 FinGenie Analysis Agent")
     st.caption("Running on Python 3.10 with LangGraph v0.2.x")
@@ -78,57 +151,40 @@ def main():
         
         status_placeholder = st.empty()
 
+    # Create tabs for views
+    tab_lookup, tab_report, tab_logs = st.tabs(["Customer Lookup", "Final Report", "Live Logs"])
+    
+    with tab_logs:
+        log_container = st.container()
+
     if run_btn:
-        app = build_graph()
-        
-        # Initial State
-        completed_nodes = []
-        full_state = {}
-        
-        # Create tabs for views
-        tab_report, tab_logs = st.tabs(["Final Report", "Live Logs"])
-        
-        with tab_logs:
-            log_container = st.container()
-        
-        # Run Stream
-        thread = {"configurable": {"thread_id": "streamlit-1"}}
-        inputs = {"messages": [("human", f"Analyze customers: {customer_ids}")]}
-        
         try:
-            # LangGraph stream returns events
-            # For StateGraph, it usually yields a dict mapping node_name -> output
-            stream_iterator = app.stream(inputs, thread, stream_mode="updates")
-            
-            for event in stream_iterator:
-                # event is a dict. In 'updates' mode: {node_name: {updated_state_keys: values}}
-                for node_name, updates in event.items():
-                    completed_nodes.append(node_name)
-                    render_agent_status(status_placeholder, node_name, completed_nodes)
-                    
-                    # Update internal state (for final report)
-                    if isinstance(updates, dict):
-                         full_state.update(updates)
-                    
-                    # Log update
-                    with log_container:
-                        with st.expander(f"Output from {node_name}", expanded=False):
-                            st.json(updates)
-                    
-                    time.sleep(0.5) 
-
-            # Final rendering
-            render_agent_status(status_placeholder, "DONE", completed_nodes)
-            
-            with tab_report:
-                if "final_table" in full_state:
-                    st.success("Analysis Complete!")
-                    st.components.v1.html(full_state["final_table"], height=800, scrolling=True)
-                else:
-                    st.error("No report generated.")
-                    
+            run_analysis(customer_ids, status_placeholder, log_container)
         except Exception as e:
             st.error(f"Error executing workflow: {e}")
+            return
+    elif "results" in st.session_state:
+        # Re-render logs from the last run after widget interactions
+        with log_container:
+            for node_name, summary in st.session_state["results"]["logs"]:
+                with st.expander(f"Output from {node_name}", expanded=False):
+                    st.json(summary)
+
+    results = st.session_state.get("results")
+    if results is None:
+        return
+    if results["unknown_cifs"]:
+        st.warning(f"Unknown customer IDs skipped: {', '.join(results['unknown_cifs'][:20])}")
+    if not results["customer_ids"]:
+        st.error("No report generated.")
+        return
+
+    if run_btn:
+        st.success("Analysis Complete!")
+    with tab_lookup:
+        render_customer_lookup(results)
+    with tab_report:
+        render_report_pages(results)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,118 @@
+"""
+Startup benchmark based on `python -X importtime`.
+
+Imports each target module in a fresh interpreter, reports the cumulative
+import time and the slowest imported packages, and exits non-zero when a
+target exceeds its budget. A "module:function" target also times a cold call
+of that function (e.g. src.graph:build_graph, which the Streamlit app runs on
+its first page load) and lists the packages the call imports.
+
+    python src/bench_startup.py
+    python src/bench_startup.py --target src.graph=150 --target src.graph:build_graph=2500 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# target -> budget in milliseconds (best of --repeat runs). "module" budgets the
+# cumulative import time, "module:function" the import plus one cold call.
+DEFAULT_TARGETS = {
+    "src.graph": 150,
+    "src.export": 50,
+    # Streamlit cold boot: app.py imports src.graph, get_app() calls build_graph()
+    "src.graph:build_graph": 2500,
+}
+
+# Prints the wall time (ms) of the import plus the call
+_CALL_SCRIPT = """
+import time
+start = time.perf_counter()
+import {module}
+{module}.{function}()
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure(target, python=sys.executable):
+    """
+    Returns (total_ms, [(cumulative_ms, module_name), ...]) for one cold run of
+    `target`. For "module" the list holds the module's direct imports, for
+    "module:function" the top-level packages imported during the call.
+    """
+    module, _, function = target.partition(":")
+    code = _CALL_SCRIPT.format(module=module, function=function) if function else f"import {module}"
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Running {target} failed:\n{proc.stderr[-2000:]}")
+
+    # Lines are "import time: self_us | cumulative_us | <indent>module", children
+    # listed before their parent with two extra spaces of indentation.
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, int(cumulative_us) / 1000.0, name.strip()))
+
+    total, children = 0.0, []
+    for i, (depth, ms, name) in enumerate(entries):
+        if depth == 0 and name == module:
+            total = ms
+            if function:
+                # Lazy imports triggered by the call are logged as top-level entries
+                children = [(child_ms, child_name) for child_depth, child_ms, child_name in entries[i + 1:]
+                            if child_depth == 0]
+                break
+            for child_depth, child_ms, child_name in reversed(entries[:i]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    children.append((child_ms, child_name))
+    if function:
+        total = float(proc.stdout.strip().splitlines()[-1])
+    return total, sorted(children, reverse=True)
+
+
+def parse_targets(values):
+    if not values:
+        return dict(DEFAULT_TARGETS)
+    targets = {}
+    for value in values:
+        module, _, budget = value.partition("=")
+        targets[module] = float(budget) if budget else float("inf")
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import time against a budget.")
+    parser.add_argument("--target", action="append", metavar="MODULE[:FUNCTION][=BUDGET_MS]",
+                        help="Module to import, optionally a function to call cold (repeatable). Defaults: " +
+                             ", ".join(f"{m}={b}" for m, b in DEFAULT_TARGETS.items()))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the best run is reported")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for target, budget in parse_targets(args.target).items():
+        runs = [measure(target) for _ in range(args.repeat)]
+        total, top = min(runs, key=lambda run: run[0])
+        status = "OK" if total <= budget else "OVER BUDGET"
+        print(f"{target}: {total:.1f} ms (budget {budget:g} ms) {status}")
+        for ms, name in top[:args.top]:
+            print(f"    {ms:8.1f} ms  {name}")
+        if total > budget:
+            over_budget.append(target)
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+# --- Checkpointing ---
+# Disk-backed (SQLite) or in-memory checkpointer with a compact serializer, plus
+# helpers to replay a stored thread from any node (e.g. only recommender_agent
+# and reporter_agent after credit_cards.txt changes).
+#
+# SqliteSaver stores all channel values in every checkpoint. To keep large
+# values (the filtered source DataFrames, result tables) from being stored
+# again at each step, they are stored once per content hash in a side table
+# (ValueStore) and checkpoints only hold a reference.
+#
+# Checkpoint files are trusted input: DataFrames (and any value msgpack can't
+# encode) are stored with pickle, so loading a checkpoint runs pickle. Only
+# open .sqlite files you created.
+
+COMPRESS_MIN_BYTES = 1024
+COMPRESSED_SUFFIX = "+zlib"
+# Channel values at least this large (serialized) go to the ValueStore
+STORE_MIN_BYTES = 16 * 1024
+VALUE_REF_KEY = "__value_ref__"
+VALUE_REF_TYPE = "value_ref"
+VALUE_CACHE_SIZE = 64
+
+
+def allowed_result_types():
+    """Result types stored in state that the checkpoint deserializer may rebuild."""
+    models = [
+        "DemographicRow", "CustomerProfile", "SingleCustomerAnalysis", "CCHoldingRow",
+        "IncomeRow", "CCRecommender", "SingleCCAnalysis",
+    ]
+    return [("src.agents.utils", name) for name in models] + [("src.agents.columnar", "ResultTable")]
+
+
+class ValueStore:
+    """
+    Serialized values stored once per content hash in the checkpoint_values
+    table of the checkpoint database (own connection, so it doesn't contend
+    with the saver's lock). Recently loaded values are kept in memory.
+    """
+    def __init__(self, path):
+        import sqlite3
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS checkpoint_values (digest TEXT PRIMARY KEY, type TEXT, data BLOB)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._stored = set()
+        self._loaded = OrderedDict()  # digest -> deserialized value
+
+    def put(self, type_, data, encode=None):
+        """
+        Stores (type_, data) unless already stored; returns its digest (of the
+        raw data). `encode(type_, data)` (e.g. compression) runs only for new values.
+        """
+        digest = hashlib.sha256(type_.encode("utf-8") + b"\0" + data).hexdigest()
+        with self._lock:
+            if digest not in self._stored:
+                if encode is not None:
+                    type_, data = encode(type_, data)
+                self.conn.execute("INSERT OR IGNORE INTO checkpoint_values (digest, type, data) VALUES (?, ?, ?)",
+                                  (digest, type_, data))
+                self.conn.commit()
+                self._stored.add(digest)
+        return digest
+
+    def get(self, digest, loads):
+        """Returns the stored value, deserialized with `loads((type_, data))`."""
+        with self._lock:
+            if digest in self._loaded:
+                self._loaded.move_to_end(digest)
+                return self._loaded[digest]
+            row = self.conn.execute("SELECT type, data FROM checkpoint_values WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Checkpoint value {digest} not found.")
+        value = loads((row[0], row[1]))
+        with self._lock:
+            self._loaded[digest] = value
+            while len(self._loaded) > VALUE_CACHE_SIZE:
+                self._loaded.popitem(last=False)
+        return value
+
+    def close(self):
+        self.conn.close()
+
+
+class CompactSerializer:
+    """
+    Wraps langgraph's JsonPlusSerializer: msgpack where possible, pickle for
+    values msgpack can't handle (DataFrames in state), and zlib for anything
+    larger than COMPRESS_MIN_BYTES. With a `value_store`, large values (source
+    DataFrames, result tables) are stored once and checkpoints only hold a
+    reference, instead of re-serializing them at every step.
+    """
+    def __init__(self, level=6, value_store=None):
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+        self.level = level
+        self.value_store = value_store
+        try:
+            self.serde = JsonPlusSerializer(pickle_fallback=True, allowed_msgpack_modules=allowed_result_types())
+        except TypeError:
+            # Older langgraph-checkpoint without the msgpack allow-list
+            self.serde = JsonPlusSerializer(pickle_fallback=True)
+
+    def dumps_typed(self, obj):
+        if self.value_store is not None:
+            if _is_checkpoint(obj):
+                obj = {**obj, "channel_values": {key: self._store_large(value)
+                                                 for key, value in obj["channel_values"].items()}}
+            else:
+                # A node's pending write, e.g. filter_node's DataFrames
+                ref = self._store_large(obj)
+                if ref is not obj:
+                    return VALUE_REF_TYPE, ref[VALUE_REF_KEY].encode("ascii")
+        return self._compress(*self.serde.dumps_typed(obj))
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_ == VALUE_REF_TYPE:
+            return self.value_store.get(payload.decode("ascii"), self.loads_typed)
+        if type_.endswith(COMPRESSED_SUFFIX):
+            type_, payload = type_[:-len(COMPRESSED_SUFFIX)], zlib.decompress(payload)
+        obj = self.serde.loads_typed((type_, payload))
+        if self.value_store is not None and _is_checkpoint(obj):
+            obj["channel_values"] = {
+                key: self.value_store.get(value[VALUE_REF_KEY], self.loads_typed) if _is_value_ref(value) else value
+                for key, value in obj["channel_values"].items()
+            }
+        return obj
+
+    def _compress(self, type_, data):
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data, self.level)
+        return type_, data
+
+    def _store_large(self, value):
+        """Returns a reference dict for large values (stored in the ValueStore), else the value itself."""
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) < STORE_MIN_BYTES:
+            return value
+        return {VALUE_REF_KEY: self.value_store.put(type_, data, encode=self._compress)}
+
+
+def _is_checkpoint(obj):
+    return isinstance(obj, dict) and isinstance(obj.get("channel_values"), dict)
+
+
+def _is_value_ref(value):
+    return isinstance(value, dict) and len(value) == 1 and VALUE_REF_KEY in value
+
+
+def open_checkpointer(path=None):
+    """
+    Returns a SqliteSaver writing to `path`, or an in-memory saver when path is None.
+    Both use CompactSerializer; the SQLite one stores large values once in a
+    ValueStore. Call close_checkpointer() when done.
+    """
+    if path is None:
+        # MemorySaver already stores each channel version once
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver(serde=CompactSerializer())
+
+    import sqlite3
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise ImportError("Persistent checkpoints require langgraph-checkpoint-sqlite "
+                          "(pip install langgraph-checkpoint-sqlite).") from e
+    # SqliteSaver serializes access with its own lock, so sharing across threads is safe
+    conn = sqlite3.connect(path, check_same_thread=False)
+    return SqliteSaver(conn, serde=CompactSerializer(value_store=ValueStore(path)))
+
+
+def close_checkpointer(checkpointer):
+    value_store = getattr(getattr(checkpointer, "serde", None), "value_store", None)
+    if value_store is not None:
+        value_store.close()
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None:
+        conn.close()
+
+
+def resume_config(app, thread_id, node):
+    """
+    Returns the config of the latest checkpoint in `thread_id` that is about to
+    run `node`. Invoking the graph with input None and this config replays
+    `node` and everything after it on the stored upstream state.
+    """
+    thread = {"configurable": {"thread_id": thread_id}}
+    seen_nodes = set()
+    for snapshot in app.get_state_history(thread):
+        if node in snapshot.next:
+            return snapshot.config
+        seen_nodes.update(snapshot.next)
+    if not seen_nodes:
+        raise ValueError(f"No checkpoints stored for thread '{thread_id}'.")
+    raise ValueError(f"Thread '{thread_id}' has no checkpoint before '{node}'. "
+                     f"Resumable nodes: {sorted(seen_nodes)}")
+
+
+def resume_from(app, thread_id, node):
+    """Re-runs `node` and all downstream nodes for a stored thread; returns the final state."""
+    return app.invoke(None, resume_config(app, thread_id, node))
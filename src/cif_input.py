@@ -0,0 +1,77 @@
+import re
+
+# --- Bulk CIF Input ---
+# Normalizes, deduplicates and validates target customer IDs (in-memory lists
+# or streamed ID files) against the CIF index in one vectorized pass.
+
+CIF_COLUMN = "cif_id_mask"
+DEFAULT_CHUNKSIZE = 500_000
+_MESSAGE_PATTERN = re.compile(r"Analyze customers?\s*:?\s*(.*)", re.IGNORECASE | re.DOTALL)
+
+
+def normalize_cifs(values):
+    """
+    Returns unique, normalized IDs as a pandas Series of str (first occurrence
+    order). Strips whitespace and the ".0" suffix of IDs read as floats, and
+    drops blanks.
+    """
+    import pandas as pd
+
+    ids = pd.Series(values, dtype="object").dropna().astype(str).str.strip()
+    dotted = ids.str.contains(".", regex=False)
+    if dotted.any():
+        ids[dotted] = ids[dotted].str.replace(r"\.0+$", "", regex=True)
+    ids = ids[ids != ""]
+    return ids.drop_duplicates().reset_index(drop=True)
+
+
+def read_cif_file(path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streams an ID file in chunks: either one ID per line, or a CSV with a
+    cif_id_mask column. Returns normalized, deduplicated IDs.
+    """
+    import pandas as pd
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        header = f.readline().strip()
+    columns = [c.strip() for c in header.split(",")]
+    if CIF_COLUMN in columns:
+        reader = pd.read_csv(path, usecols=[CIF_COLUMN], dtype=str, chunksize=chunksize)
+    else:
+        reader = pd.read_csv(path, header=None, usecols=[0], names=[CIF_COLUMN], dtype=str, chunksize=chunksize)
+
+    chunks = [normalize_cifs(chunk[CIF_COLUMN]) for chunk in reader]
+    if not chunks:
+        return normalize_cifs([])
+    return normalize_cifs(pd.concat(chunks, ignore_index=True))
+
+
+def split_ids(text):
+    """Splits free text ("ID1, ID2; ID3 ...") into ID tokens."""
+    return [token for token in re.split(r"[,\s;]+", text or "") if token]
+
+
+def ids_from_message(content):
+    """Parses "Analyze customers: ID1, ID2" / "Analyze customer ID" messages. Returns [] if none."""
+    match = _MESSAGE_PATTERN.search(content or "")
+    if not match:
+        return []
+    return split_ids(match.group(1))
+
+
+def resolve_target_cifs(target, cif_index):
+    """
+    Resolves `target` (list/array/Series of IDs, or a path to an ID file)
+    against `cif_index` (unique pandas Index of known IDs as str).
+    Returns (known_ids, unknown_ids) as lists, in input order.
+    """
+    ids = read_cif_file(target) if isinstance(target, str) else normalize_cifs(target)
+    # get_indexer reuses the index's cached hash table (isin would rebuild one per call)
+    known = cif_index.get_indexer(ids.to_numpy()) >= 0
+    return ids[known].tolist(), ids[~known].tolist()
+
+
+def summarize_ids(ids, limit=20):
+    """Short human-readable ID list for messages."""
+    shown = ", ".join(ids[:limit])
+    return shown + (f", ... (+{len(ids) - limit:,} more)" if len(ids) > limit else "")
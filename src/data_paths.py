@@ -0,0 +1,22 @@
+import os
+
+# Source data locations, shared by the graph (src.graph.load_data) and the
+# agents/CLIs that read files directly. Kept free of heavy imports.
+# The data directory can be overridden with FINGENIE_DATA_DIR (read at import).
+
+DATA_DIR = os.getenv("FINGENIE_DATA_DIR", os.path.join(os.path.dirname(__file__), '../data'))
+
+xls_path_cc = os.path.join(DATA_DIR, "cc_master_hackathon.xlsx")
+xls_path_customer = os.path.join(DATA_DIR, "customer_master_hackathon.xlsx")
+xls_path_income = os.path.join(DATA_DIR, "income_hackathon.xlsx")
+csv_path_trx = os.path.join(DATA_DIR, "ftr_txns_hackathon.csv")
+# Card catalog the recommender sends as its static prompt prefix
+CARD_CATALOG = os.path.join(DATA_DIR, "credit_cards.txt")
+
+# Source tables, keyed by the AgentState field they load into
+DATA_FILES = {
+    "trx_data": csv_path_trx,
+    "income_data": xls_path_income,
+    "cc_holding_data": xls_path_cc,
+    "demographic_data": xls_path_customer,
+}
@@ -0,0 +1,176 @@
+import csv
+import datetime
+import json
+import os
+
+EXPORT_FORMATS = ("parquet", "jsonl", "csv")
+
+# Output datasets and their columns. Each batch appends rows to every dataset.
+DATASETS = {
+    "summaries": ["customer_id", "demographic_summary", "income_info", "cc_holding_info"],
+    "profiles": ["customer_id", "profile_name", "reason"],
+    "recommendations": ["customer_id", "rank", "cc_recommended", "recommended_reasons"],
+}
+
+
+def batch_customer_ids(tables):
+    """All customer IDs across the given result tables, in first-seen order."""
+    return list(dict.fromkeys(cid for table in tables for cid in table.customer_ids))
+
+
+def batch_rows(state, customer_ids=None):
+    """
+    Flattens agent results into rows per dataset, for all customers in the
+    results or only `customer_ids`. Accepts pydantic or columnar results.
+    """
+    from src.agents.columnar import as_table
+
+    demographics = as_table(state.get("demographic_results"))
+    transactions = as_table(state.get("transaction_results"))
+    income = as_table(state.get("income_results"))
+    cc_holdings = as_table(state.get("cc_holding_results"))
+    recos = as_table(state.get("cc_results"))
+
+    if customer_ids is None:
+        customer_ids = batch_customer_ids([demographics, transactions, income, cc_holdings, recos])
+
+    rows = {name: [] for name in DATASETS}
+    for cid in customer_ids:
+        demo_row = demographics.row(cid) or {}
+        income_row = income.row(cid) or {}
+        cc_row = cc_holdings.row(cid) or {}
+        rows["summaries"].append({
+            "customer_id": cid,
+            "demographic_summary": demo_row.get("summary"),
+            "income_info": income_row.get("income_info"),
+            "cc_holding_info": cc_row.get("cc_holding_info"),
+        })
+        for profile in transactions.child_rows("profiles", cid):
+            rows["profiles"].append({"customer_id": cid, **profile})
+        for rank, reco in enumerate(recos.child_rows("cc_summary", cid), start=1):
+            rows["recommendations"].append({"customer_id": cid, "rank": rank, **reco})
+    return rows
+
+
+class ResultExporter:
+    """
+    Writes per-customer results to Parquet, JSONL or CSV files. Every call to
+    write_batch() appends its rows (one Parquet row group) and flushes them;
+    the exporter keeps no rows between calls.
+
+    Layout: <out_dir>[/run_date=YYYY-MM-DD]/<dataset>.<ext>
+    """
+    def __init__(self, out_dir, fmt="jsonl", partition_by_date=False, run_date=None):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{fmt}'. Choose one of {EXPORT_FORMATS}.")
+        self.fmt = fmt
+        self.out_dir = out_dir
+        if partition_by_date:
+            run_date = run_date or datetime.date.today()
+            self.out_dir = os.path.join(out_dir, f"run_date={run_date.isoformat()}")
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.rows_written = {name: 0 for name in DATASETS}
+        self._writers = {}
+        self._files = {}
+
+    def path(self, dataset):
+        return os.path.join(self.out_dir, f"{dataset}.{self.fmt}")
+
+    def write_batch(self, state, customer_ids=None):
+        for dataset, rows in batch_rows(state, customer_ids).items():
+            if rows:
+                self._write(dataset, rows)
+                self.rows_written[dataset] += len(rows)
+
+    def _write(self, dataset, rows):
+        columns = DATASETS[dataset]
+        if self.fmt == "jsonl":
+            f = self._open(dataset)
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+        elif self.fmt == "csv":
+            if dataset not in self._writers:
+                writer = csv.DictWriter(self._open(dataset, newline=""), fieldnames=columns)
+                writer.writeheader()
+                self._writers[dataset] = writer
+            self._writers[dataset].writerows(rows)
+            self._files[dataset].flush()
+        else:
+            self._write_parquet(dataset, rows, columns)
+
+    def _open(self, dataset, newline=None):
+        if dataset not in self._files:
+            self._files[dataset] = open(self.path(dataset), "w", encoding="utf-8", newline=newline)
+        return self._files[dataset]
+
+    def _write_parquet(self, dataset, rows, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow).") from e
+
+        schema = pa.schema([(c, pa.int64() if c == "rank" else pa.string()) for c in columns])
+        table = pa.Table.from_pydict({c: [row.get(c) for row in rows] for c in columns}, schema=schema)
+        if dataset not in self._writers:
+            self._writers[dataset] = pq.ParquetWriter(self.path(dataset), schema)
+        # One row group per batch
+        self._writers[dataset].write_table(table)
+
+    def close(self):
+        if self.fmt == "parquet":
+            for writer in self._writers.values():
+                writer.close()
+        for f in self._files.values():
+            f.close()
+        self._writers = {}
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def export_stream(events, exporter, state=None):
+    """
+    Consumes app.stream(..., stream_mode=["updates", "custom"]) and writes rows
+    as results arrive: each recommendation chunk the recommender emits on the
+    custom stream is written together with those customers' upstream results.
+    Customers not written by then (no recommendation, or a resumed run that
+    doesn't re-run the recommender) are written when the stream ends.
+    `state` seeds the upstream results (e.g. the stored state when resuming a
+    thread from a checkpoint).
+
+    Yields the "updates" events ({node_name: updates}) so callers can keep
+    rendering progress; a plain stream_mode="updates" stream also works and is
+    then written once at the end.
+    """
+    from src.agents.columnar import as_table
+    from src.agents.recommender_agent import STREAM_CHUNK_KEY
+    from src.agents.utils import RESULT_KEYS
+
+    # Upstream results as ResultTables, converted once per update rather than per chunk
+    tables = {key: as_table(value) for key, value in (state or {}).items() if key in RESULT_KEYS}
+    written = set()
+
+    for event in events:
+        mode, payload = event if isinstance(event, tuple) else ("updates", event)
+        if mode == "custom":
+            if isinstance(payload, dict) and STREAM_CHUNK_KEY in payload:
+                chunk = payload[STREAM_CHUNK_KEY]
+                customer_ids = [item.customer_id for item in chunk if item.customer_id not in written]
+                exporter.write_batch(dict(tables, cc_results=chunk), customer_ids)
+                written.update(customer_ids)
+            continue
+        for updates in payload.values():
+            if isinstance(updates, dict):
+                tables.update({key: as_table(value) for key, value in updates.items() if key in RESULT_KEYS})
+        yield payload
+
+    remaining = [cid for cid in batch_customer_ids(tables.values()) if cid not in written]
+    if remaining:
+        exporter.write_batch(tables, remaining)
+
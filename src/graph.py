@@ -1,53 +1,84 @@
+from __future__ import annotations
+
+import argparse
+import importlib
 import os
 import sys
-import pandas as pd
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import SystemMessage, AIMessage
+import threading
+from typing import TYPE_CHECKING
 
 # Add src to path so we can import agents
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.agents.utils import AgentState, get_llm, ExtractedIDs
-from src.agents.transaction_agent import transaction_agent
-from src.agents.demographic_agent import demographic_agent
-from src.agents.income_agent import income_agent
-from src.agents.cc_holding_agent import cc_holding_agent
-from src.agents.recommender_agent import recommender_agent
-from src.agents.reporter_agent import reporter_agent
+from src.data_paths import DATA_FILES
+from src.export import EXPORT_FORMATS
+
+if TYPE_CHECKING:
+    from src.agents.utils import AgentState
+
+# NOTE: langgraph, langchain_core, pandas and the agent modules are imported
+# lazily (inside build_graph / the node functions) to keep cold start cheap.
+# Check with: python src/bench_startup.py
+
+# Nodes in execution order, mapped to the module that defines each agent
+AGENT_MODULES = {
+    "scoring_node": "src.agents.scoring",
+    "segmentation_node": "src.agents.segmentation",
+    "transaction_agent": "src.agents.transaction_agent",
+    "demographic_agent": "src.agents.demographic_agent",
+    "income_agent": "src.agents.income_agent",
+    "cc_holding_agent": "src.agents.cc_holding_agent",
+    "recommender_agent": "src.agents.recommender_agent",
+    "reporter_agent": "src.agents.reporter_agent",
+}
+NODE_ORDER = ["filter_node"] + list(AGENT_MODULES)
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+def __getattr__(name):
+    # Keep `from src.graph import transaction_agent` working without eager imports
+    if name in AGENT_MODULES:
+        return getattr(importlib.import_module(AGENT_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_data_cache = {}
+_data_lock = threading.Lock()
+
+def load_data():
+    """
+    Loads the source tables once and reuses them until a file changes (keyed by
+    mtime). Returns {state key: DataFrame} plus "keys": {state key: cif_id_mask as str}
+    and "cif_index": the known customer IDs (customer master) as a pandas Index.
+    Raises FileNotFoundError if a file is missing.
+    """
+    import pandas as pd
 
-xls_path_cc = os.path.join(DATA_DIR, "cc_master_hackathon.xlsx")
-xls_path_customer = os.path.join(DATA_DIR, "customer_master_hackathon.xlsx")
-xls_path_income = os.path.join(DATA_DIR, "income_hackathon.xlsx")
-csv_path_trx = os.path.join(DATA_DIR, "ftr_txns_hackathon.csv")
-file_path_txt = os.path.join(DATA_DIR, "credit_cards.txt")
+    stamp = tuple(os.path.getmtime(path) for path in DATA_FILES.values())
+    with _data_lock:
+        if _data_cache.get("stamp") != stamp:
+            frames = {
+                key: pd.read_csv(path) if path.endswith(".csv") else pd.read_excel(path)
+                for key, path in DATA_FILES.items()
+            }
+            keys = {key: df["cif_id_mask"].astype(str) for key, df in frames.items() if "cif_id_mask" in df.columns}
+            # Known customers = customer master
+            cif_index = pd.Index(keys["demographic_data"].unique()) if "demographic_data" in keys else pd.Index([])
+            _data_cache.clear()
+            _data_cache.update(stamp=stamp, frames=frames, keys=keys, cif_index=cif_index)
+        return dict(_data_cache["frames"], keys=_data_cache["keys"], cif_index=_data_cache["cif_index"])
 
 def filter_node(state: AgentState):
     """
-    Entry point: Extracts customer IDs from message and retrieves relevant data frames.
+    Entry point: Resolves the target customer IDs and retrieves relevant data frames.
+    IDs come from state['target_cifs'] (list of IDs or path to an ID file) or,
+    failing that, from the last message ("Analyze customers: ID1, ID2, ...").
+    Unknown IDs are reported in state['unknown_cifs']. target_cifs is cleared once
+    consumed so a later run on the same thread doesn't silently reuse it.
     """
-    # Extract customer IDs from the message
-    messages = state.get("messages", [])
-    id_list = ["789012"]  # Default fallback
-    
-    if messages:
-        last_message = messages[-1]
-        message_content = last_message.content if hasattr(last_message, 'content') else str(last_message[1] if isinstance(last_message, tuple) else last_message)
-        
-        # Extract IDs from message (look for pattern "Analyze customers: ID1, ID2, ...")
-        if "Analyze customers:" in message_content:
-            ids_str = message_content.split("Analyze customers:")[-1].strip()
-            # Split by comma and clean up
-            id_list = [id.strip() for id in ids_str.split(",") if id.strip()]
-    
-    # Load Data
+    from langchain_core.messages import AIMessage
+    from src.cif_input import ids_from_message, resolve_target_cifs, summarize_ids
+
+    # Load Data (cached across runs until the files change)
     try:
-        trx_data = pd.read_csv(csv_path_trx)
-        df_income = pd.read_excel(xls_path_income)
-        df_cc = pd.read_excel(xls_path_cc)
-        df_customer = pd.read_excel(xls_path_customer)
+        data = load_data()
     except FileNotFoundError as e:
         return {
              "messages": [AIMessage(content=f"Error loading data files: {str(e)}. Please ensure data/ directory is populated.")],
@@ -58,58 +89,150 @@ def filter_node(state: AgentState):
     column_name = "cif_id_mask"
     
     # Ensure column exists (Mock data robustness)
-    if column_name not in df_customer.columns:
+    if any(key not in data["keys"] for key in DATA_FILES):
         # Fallback for dummy data if columns aren't exact
         return {"messages": [AIMessage(content=f"Column {column_name} not found in data.")]}
 
-    filtered_trx = trx_data[trx_data[column_name].astype(str).isin(id_list)]
-    filtered_income = df_income[df_income[column_name].astype(str).isin(id_list)]
-    filtered_cc = df_cc[df_cc[column_name].astype(str).isin(id_list)]
-    filtered_customer = df_customer[df_customer[column_name].astype(str).isin(id_list)]
+    target = state.get("target_cifs")
+    if target is None:
+        messages = state.get("messages", [])
+        target = []
+        if messages:
+            last_message = messages[-1]
+            message_content = last_message.content if hasattr(last_message, 'content') else str(last_message[1] if isinstance(last_message, tuple) else last_message)
+            target = ids_from_message(message_content)
+
+    try:
+        id_list, unknown = resolve_target_cifs(target, data["cif_index"])
+    except (FileNotFoundError, ValueError) as e:
+        id_list, unknown = [], []
+        notes = [f"Could not read target CIFs: {e}"]
+    else:
+        notes = []
+    if unknown:
+        notes.append(f"{len(unknown):,} unknown customer IDs: {summarize_ids(unknown)}")
+    if not id_list:
+        notes.append("No valid customer IDs to analyze.")
+
+    filtered = {key: data[key][data["keys"][key].isin(id_list)] for key in DATA_FILES}
     
     return {
-        "trx_data": filtered_trx,
-        "demographic_data": filtered_customer,
-        "cc_holding_data": filtered_cc,
-        "income_data": filtered_income,
-        "messages": [AIMessage(content=f"Filtered records for {id_list}")],
+        **filtered,
+        "unknown_cifs": unknown,
+        "target_cifs": None,
+        "messages": [AIMessage(content=" ".join(([f"Filtered records for {len(id_list):,} customers: {summarize_ids(id_list)}."] if id_list else []) + notes))],
         "sender": "filter_node"
     }
 
-def main():
-    # Define Graph
+def build_graph(checkpointer=None, node_wrapper=None):
+    """
+    Builds and compiles the workflow graph, importing langgraph and the agents on demand.
+    `node_wrapper(node_name, fn)` can wrap every node (e.g. NodeProfiler.wrap).
+    """
+    from langgraph.graph import StateGraph, START, END
+    from src.agents.utils import AgentState
+
     workflow = StateGraph(state_schema=AgentState)
     
     # Add Nodes
-    workflow.add_node("filter_node", filter_node)
-    workflow.add_node("transaction_agent", transaction_agent)
-    workflow.add_node("demographic_agent", demographic_agent)
-    workflow.add_node("income_agent", income_agent)
-    workflow.add_node("cc_holding_agent", cc_holding_agent)
-    workflow.add_node("recommender_agent", recommender_agent)
-    workflow.add_node("reporter_agent", reporter_agent)
+    nodes = {"filter_node": filter_node}
+    for node_name, module_name in AGENT_MODULES.items():
+        nodes[node_name] = getattr(importlib.import_module(module_name), node_name)
+    for node_name, fn in nodes.items():
+        workflow.add_node(node_name, node_wrapper(node_name, fn) if node_wrapper else fn)
     
     # Add Edges (Linear for now, but modular agents allow for future complex routing)
-    workflow.add_edge(START, "filter_node")
-    workflow.add_edge("filter_node", "transaction_agent")
-    workflow.add_edge("transaction_agent", "demographic_agent")
-    workflow.add_edge("demographic_agent", "income_agent")
-    workflow.add_edge("income_agent", "cc_holding_agent")
-    workflow.add_edge("cc_holding_agent", "recommender_agent")
-    workflow.add_edge("recommender_agent", "reporter_agent")
-    workflow.add_edge("reporter_agent", END)
+    workflow.add_edge(START, NODE_ORDER[0])
+    for source, target in zip(NODE_ORDER, NODE_ORDER[1:]):
+        workflow.add_edge(source, target)
+    workflow.add_edge(NODE_ORDER[-1], END)
     
-    # Compile
-    memory = MemorySaver()
-    app = workflow.compile(checkpointer=memory)
+    return workflow.compile(checkpointer=checkpointer)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the customer analysis workflow.")
+    parser.add_argument("--cifs", help="Comma-separated customer IDs to analyze")
+    parser.add_argument("--cif-file", help="File of customer IDs (one per line, or CSV with a cif_id_mask column)")
+    parser.add_argument("--export-format", choices=EXPORT_FORMATS,
+                        help="Also write per-customer results as Parquet, JSONL or CSV")
+    parser.add_argument("--export-dir", default="results", help="Output directory for exported results")
+    parser.add_argument("--partition-by-date", action="store_true",
+                        help="Write exports under <export-dir>/run_date=YYYY-MM-DD/")
+    parser.add_argument("--checkpoint-db", help="SQLite file for persistent checkpoints (default: in-memory)")
+    parser.add_argument("--thread-id", default="analysis-1", help="Checkpoint thread to run or resume")
+    parser.add_argument("--resume-from", choices=NODE_ORDER,
+                        help="Re-run this node and everything after it on the stored state of --thread-id")
+    parser.add_argument("--profile", choices=("cprofile", "sampling"),
+                        help="Profile each node (cProfile -> .pstats, sampling -> .collapsed stacks) with per-node tracemalloc")
+    parser.add_argument("--profile-dir", default="profiles", help="Parent directory for profiling run directories")
+    parser.add_argument("--no-alloc", action="store_true", help="With --profile, skip tracemalloc allocation tracking")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from src.checkpoint import open_checkpointer, close_checkpointer, resume_config
+    if args.resume_from and not args.checkpoint_db:
+        print("--resume-from needs --checkpoint-db (in-memory checkpoints don't survive the process).")
+        return
+    checkpointer = open_checkpointer(args.checkpoint_db)
+    profiler = None
+    if args.profile:
+        from src.profiling import NodeProfiler
+        profiler = NodeProfiler(args.profile_dir, mode=args.profile, trace_memory=not args.no_alloc)
+    app = build_graph(checkpointer=checkpointer, node_wrapper=profiler.wrap if profiler else None)
     
     # Run
-    print("Running Customer Analysis Workflow...")
-    thread = {"configurable": {"thread_id": "analysis-1"}}
+    thread = {"configurable": {"thread_id": args.thread_id}}
     
-    # Initial fake message to trigger extraction
-    result = app.invoke({"messages": [("human", "Analyze customer 789012")]}, thread)
+    # Always send explicit target_cifs: --cif-file, --cifs, else the IDs in the default message
+    from src.cif_input import ids_from_message, split_ids
+    message = "Analyze customer 789012"
+    inputs = {"messages": [("human", message)], "target_cifs": ids_from_message(message)}
+    if args.cif_file:
+        if not os.path.exists(args.cif_file):
+            print(f"CIF file not found: {args.cif_file}")
+            close_checkpointer(checkpointer)
+            return
+        inputs["target_cifs"] = args.cif_file
+    elif args.cifs:
+        inputs["target_cifs"] = split_ids(args.cifs)
+    if args.resume_from:
+        print(f"Resuming thread {args.thread_id} from {args.resume_from}...")
+        try:
+            thread = resume_config(app, args.thread_id, args.resume_from)
+        except ValueError as e:
+            print(e)
+            close_checkpointer(checkpointer)
+            return
+        inputs = None
+    else:
+        print("Running Customer Analysis Workflow...")
+
+    if args.export_format:
+        from src.export import ResultExporter, export_stream
+        # When resuming, upstream results come from the checkpoint
+        seed = app.get_state(thread).values if args.resume_from else None
+        events = app.stream(inputs, thread, stream_mode=["updates", "custom"])
+        # Keep only what's printed/saved below; full results live in the checkpoint
+        result = {}
+        with ResultExporter(args.export_dir, args.export_format, partition_by_date=args.partition_by_date) as exporter:
+            for event in export_stream(events, exporter, state=seed):
+                for updates in event.values():
+                    if isinstance(updates, dict):
+                        result.update({k: v for k, v in updates.items() if k in ("final_table", "unknown_cifs")})
+        print(f"Exported results to {exporter.out_dir}: {exporter.rows_written}")
+    else:
+        result = app.invoke(inputs, thread)
+    close_checkpointer(checkpointer)
+
+    if profiler:
+        print(profiler.finish())
+        print(f"\nProfiling artifacts written to {profiler.run_dir}")
     
+    if result.get("unknown_cifs"):
+        print(f"Unknown customer IDs ({len(result['unknown_cifs'])}): {', '.join(result['unknown_cifs'][:20])}")
+
     print("\nWorkflow Finished.")
     print("-" * 30)
     print("Final Report HTML generated.")
@@ -122,5 +245,9 @@ def main():
     else:
         print("No report generated.")
 
+    # Results leave the graph as pydantic rows, whatever result_format was used
+    from src.agents.utils import results_as_models
+    return {**result, **results_as_models(result)}
+
 if __name__ == "__main__":
     main()
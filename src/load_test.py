@@ -0,0 +1,297 @@
+"""
+Concurrent end-to-end load test for the compiled graph.
+
+Drives many simultaneous invoke/stream calls, each with its own thread_id and
+customer set, against generated data and a latency-simulating Mock LLM.
+Reports latency percentiles, throughput, error rate, memory growth over time
+and any cross-thread state leakage (results or messages for customers that
+request never asked for).
+
+    python src/load_test.py --requests 200 --concurrency 16 --mock-latency 0.05
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+FIRST_ID = 200000  # 6-digit IDs, as the Mock LLM extracts customer IDs by that pattern
+CARD_CATALOG = os.path.join(os.path.dirname(__file__), '..', 'data', 'credit_cards.txt')
+
+
+def generate_data(out_dir, n_customers, seed=0):
+    """Writes synthetic source files (and the card catalog) in the layout graph.filter_node expects."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    ids = np.arange(FIRST_ID, FIRST_ID + n_customers)
+    n_trx = n_customers * 5
+    # Keep amounts/limits/incomes below 6 digits so they can't be mistaken for IDs
+    pd.DataFrame({
+        "cif_id_mask": np.repeat(ids, 5),
+        "in_out_flow": rng.choice(["outflow", "inflow"], n_trx, p=[0.8, 0.2]),
+        "mcc_code": rng.choice([5411, 4511, 5812, 5541, 5311, 7011], n_trx),
+        "amount": rng.gamma(2.0, 150.0, n_trx).round(2),
+    }).to_csv(os.path.join(out_dir, "ftr_txns_hackathon.csv"), index=False)
+    pd.DataFrame({
+        "cif_id_mask": ids,
+        "income_cust": rng.integers(5000, 90000, n_customers),
+        "income_kyc": rng.integers(5000, 90000, n_customers),
+    }).to_excel(os.path.join(out_dir, "income_hackathon.xlsx"), index=False)
+    pd.DataFrame({
+        "cif_id_mask": ids,
+        "cc_account_open_date": "2019-01-01",
+        "embossed_bin_desc": rng.choice(["Visa Infinite", "Mastercard Titanium", "Visa Signature"], n_customers),
+        "cc_credit_limit": rng.integers(5000, 90000, n_customers),
+        "cc_account_closed_date": None,
+    }).to_excel(os.path.join(out_dir, "cc_master_hackathon.xlsx"), index=False)
+    pd.DataFrame({
+        "cif_id_mask": ids,
+        "residence_since": "2012-01-01",
+        "relationship_start_date": "2014-01-01",
+        "employment_status": rng.choice(["Employed", "Self-Employed"], n_customers),
+        "gender": rng.choice(["Male", "Female"], n_customers),
+        "marital_status": rng.choice(["Married", "Single"], n_customers),
+        "dependents": rng.integers(0, 4, n_customers),
+        "nationality": rng.choice(["UAE", "India", "UK"], n_customers),
+    }).to_excel(os.path.join(out_dir, "customer_master_hackathon.xlsx"), index=False)
+    # The recommender's catalog prefix; without it every call would send "list not found"
+    shutil.copy(CARD_CATALOG, os.path.join(out_dir, "credit_cards.txt"))
+    return [str(i) for i in ids]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def result_customer_ids(state):
+    from src.agents.utils import RESULT_KEYS
+
+    ids = set()
+    for key in RESULT_KEYS:
+        value = state.get(key)
+        if value is None:
+            continue
+        ids.update(value.customer_ids if hasattr(value, "customer_ids") else (item.customer_id for item in value))
+    return ids
+
+
+def check_leakage(app, config, requested, final_state):
+    """Returns a list of leakage findings for one request (empty if clean)."""
+    findings = []
+    foreign = result_customer_ids(final_state) - set(requested)
+    if foreign:
+        findings.append(f"results contain foreign customers {sorted(foreign)[:5]}")
+    missing = set(requested) - result_customer_ids(final_state)
+    if missing:
+        findings.append(f"results missing requested customers {sorted(missing)[:5]}")
+
+    # The thread's stored history must only hold this request's own input
+    stored = app.get_state(config).values
+    human = [m for m in stored.get("messages", []) if getattr(m, "type", None) == "human"]
+    if len(human) != 1 or human[0].content != request_message(requested):
+        findings.append(f"thread history has {len(human)} human messages / foreign input")
+    return findings
+
+
+def request_message(customer_ids):
+    return f"Analyze customers: {', '.join(customer_ids)}"
+
+
+def current_memory():
+    """(current, peak) bytes: tracemalloc when tracing, else process RSS."""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        current = peak
+    return current, peak
+
+
+class MemorySampler(threading.Thread):
+    """Samples current/peak memory every `interval` seconds."""
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._done = threading.Event()
+        self.start_time = time.perf_counter()
+
+    def run(self):
+        while not self._done.is_set():
+            self.samples.append((time.perf_counter() - self.start_time, *current_memory()))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.samples.append((time.perf_counter() - self.start_time, *current_memory()))
+
+
+def run_load_test(n_requests, concurrency, customers_per_request, customer_ids,
+                  stream_ratio=0.5, checkpoint_db=None, sample_interval=0.5, trace_python_memory=False, seed=0):
+    from src.graph import build_graph
+    from src.checkpoint import open_checkpointer, close_checkpointer
+    from src.agents.utils import get_controller
+
+    checkpointer = open_checkpointer(checkpoint_db)
+    app = build_graph(checkpointer=checkpointer)
+    rng = random.Random(seed)
+    plans = [
+        (i, sorted(rng.sample(customer_ids, customers_per_request)), rng.random() < stream_ratio)
+        for i in range(n_requests)
+    ]
+
+    latencies, errors, leaks = [], [], []
+    lock = threading.Lock()
+
+    def one_request(plan):
+        i, requested, use_stream = plan
+        config = {"configurable": {"thread_id": f"load-{i}"}}
+        inputs = {"messages": [("human", request_message(requested))]}
+        start = time.perf_counter()
+        try:
+            if use_stream:
+                final_state = {}
+                for event in app.stream(inputs, config, stream_mode="updates"):
+                    for updates in event.values():
+                        if isinstance(updates, dict):
+                            final_state.update(updates)
+            else:
+                final_state = app.invoke(inputs, config)
+            elapsed = time.perf_counter() - start
+            findings = check_leakage(app, config, requested, final_state)
+        except Exception as e:
+            with lock:
+                errors.append(f"load-{i}: {type(e).__name__}: {e}")
+            return
+        with lock:
+            latencies.append(elapsed)
+            leaks.extend(f"load-{i}: {finding}" for finding in findings)
+
+    if trace_python_memory:
+        tracemalloc.start()
+    sampler = MemorySampler(sample_interval)
+    sampler.start()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, plans))
+    wall = time.perf_counter() - wall_start
+    sampler.stop()
+    if trace_python_memory:
+        tracemalloc.stop()
+    close_checkpointer(checkpointer)
+
+    samples = sampler.samples
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "throughput_rps": n_requests / wall if wall else 0.0,
+        "error_rate": len(errors) / n_requests if n_requests else 0.0,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "memory": {
+            "source": "tracemalloc" if trace_python_memory else "rss",
+            "start_mb": samples[0][1] / 1e6,
+            "end_mb": samples[-1][1] / 1e6,
+            "peak_mb": max(s[2] for s in samples) / 1e6,
+            "growth_mb": (samples[-1][1] - samples[0][1]) / 1e6,
+            "timeline": [(round(t, 2), round(cur / 1e6, 2)) for t, cur, _ in samples],
+        },
+        "llm_controller": get_controller().metrics(),
+        "errors": errors[:20],
+        "leaks": leaks[:20],
+        "leak_count": len(leaks),
+    }
+
+
+def print_report(report):
+    lat = report["latency_seconds"]
+    mem = report["memory"]
+    print(f"Requests: {report['requests']} at concurrency {report['concurrency']} "
+          f"in {report['wall_seconds']:.2f}s ({report['throughput_rps']:.1f} req/s)")
+    print(f"Latency:  p50 {lat['p50'] * 1000:.0f} ms | p95 {lat['p95'] * 1000:.0f} ms | "
+          f"p99 {lat['p99'] * 1000:.0f} ms | max {lat['max'] * 1000:.0f} ms")
+    print(f"Errors:   {report['error_rate']:.1%}")
+    print(f"Memory ({mem['source']}): {mem['start_mb']:.1f} MB -> {mem['end_mb']:.1f} MB "
+          f"(growth {mem['growth_mb']:+.1f} MB, peak {mem['peak_mb']:.1f} MB)")
+    print(f"LLM:      {report['llm_controller']}")
+    for error in report["errors"]:
+        print(f"  ERROR {error}")
+    if report["leak_count"]:
+        print(f"LEAKAGE:  {report['leak_count']} findings")
+        for leak in report["leaks"]:
+            print(f"  LEAK {leak}")
+    else:
+        print("Leakage:  none detected")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test for the compiled graph.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--customers", type=int, default=1000, help="Customers in the generated data set")
+    parser.add_argument("--customers-per-request", type=int, default=3)
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="Share of requests using stream() instead of invoke()")
+    parser.add_argument("--mock-latency", type=float, default=0.05, help="Seconds per Mock LLM call")
+    parser.add_argument("--mock-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--checkpoint-db", help="Use a SQLite checkpointer instead of the in-memory one")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Track Python heap with tracemalloc instead of RSS (slower, more precise)")
+    parser.add_argument("--data-dir", help="Use existing data files instead of generating them")
+    parser.add_argument("--json", help="Also write the full report to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Must be set before src.graph is imported (it reads the data dir at import)
+    os.environ["FINGENIE_MOCK_LATENCY"] = str(args.mock_latency)
+    os.environ["FINGENIE_MOCK_THROTTLE_RATE"] = str(args.mock_throttle_rate)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data_dir:
+            os.environ["FINGENIE_DATA_DIR"] = args.data_dir
+            import pandas as pd
+            customer_ids = pd.read_excel(os.path.join(args.data_dir, "customer_master_hackathon.xlsx"))["cif_id_mask"].astype(str).tolist()
+        else:
+            print(f"Generating data for {args.customers} customers...")
+            os.environ["FINGENIE_DATA_DIR"] = tmp
+            customer_ids = generate_data(tmp, args.customers, seed=args.seed)
+
+        report = run_load_test(
+            args.requests, args.concurrency, min(args.customers_per_request, len(customer_ids)), customer_ids,
+            stream_ratio=args.stream_ratio, checkpoint_db=args.checkpoint_db,
+            trace_python_memory=args.tracemalloc, seed=args.seed,
+        )
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] or report["leak_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import cProfile
+import datetime
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# --- Per-node Profiling ---
+# Wraps every graph node so each execution writes its own artifacts into a run
+# directory:
+#   cprofile mode: <node>.pstats          (open with pstats / snakeviz)
+#   sampling mode: <node>.collapsed       (feed to flamegraph.pl / speedscope)
+#   both modes:    <node>.alloc.txt       (top tracemalloc allocation sites)
+# plus summary.txt with the wall time and hottest functions per node.
+# Worker threads a node starts (e.g. recommender_agent's ThreadPoolExecutor)
+# are profiled too: sampled alongside the node's thread, or given their own
+# cProfile (threading.setprofile) whose stats are merged into the node's.
+# Allocation tracking is scoped per node: tracing starts at node entry and one
+# snapshot is taken at exit, so it only covers what the node allocated and
+# still holds (not earlier imports or other nodes).
+
+PROFILE_MODES = ("cprofile", "sampling")
+TOP_FUNCTIONS = 10
+TOP_ALLOCATIONS = 5
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the call stacks of one thread, and of every thread started after
+    the sampler was created, every `interval` seconds.
+    """
+    def __init__(self, thread_id, interval=0.001):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._existing = set(sys._current_frames())
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident or (thread_id != self.thread_id and thread_id in self._existing):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class ThreadProfiles:
+    """Gives every thread started while active its own cProfile.Profile (via threading.setprofile)."""
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def _hook(self, frame, event, arg):
+        # Runs once in the new thread; enable() replaces this hook with cProfile's
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self.profiles.append(profile)
+
+    def start(self):
+        threading.setprofile(self._hook)
+
+    def stop(self):
+        threading.setprofile(None)
+
+    def merge_into(self, stats):
+        """Adds the collected thread profiles to a pstats.Stats."""
+        with self._lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            try:
+                stats.add(profile)
+            except TypeError:
+                pass  # thread made no profiled calls
+        return stats
+
+
+class NodeProfiler:
+    """
+    Profiles graph nodes. Pass `profiler.wrap` as build_graph(node_wrapper=...),
+    run the graph, then call `profiler.finish()` to write summary.txt.
+    """
+    def __init__(self, base_dir="profiles", mode="cprofile", trace_memory=True, sample_interval=0.001):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unsupported profile mode '{mode}'. Choose one of {PROFILE_MODES}.")
+        self.mode = mode
+        self.trace_memory = trace_memory
+        self.sample_interval = sample_interval
+        self.run_dir = os.path.join(base_dir, datetime.datetime.now().strftime("run-%Y%m%d-%H%M%S"))
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.summaries = []
+        self._runs = Counter()
+        self._lock = threading.Lock()
+        self._tracing = 0  # nodes currently tracing allocations
+
+    def _start_tracing(self):
+        with self._lock:
+            self._tracing += 1
+            if self._tracing == 1:
+                tracemalloc.start()
+
+    def _stop_tracing(self):
+        """Returns the snapshot of allocations made since tracing started."""
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0:
+                tracemalloc.stop()
+        return snapshot
+
+    def wrap(self, node_name, fn):
+        @functools.wraps(fn)
+        def profiled(state, *args, **kwargs):
+            with self._lock:
+                self._runs[node_name] += 1
+                run = self._runs[node_name]
+            artifact = os.path.join(self.run_dir, node_name if run == 1 else f"{node_name}.{run}")
+
+            if self.trace_memory:
+                self._start_tracing()
+            profiler = threads = sampler = None
+            if self.mode == "cprofile":
+                threads = ThreadProfiles()
+                threads.start()
+                profiler = cProfile.Profile()
+                profiler.enable()
+            else:
+                sampler = StackSampler(threading.get_ident(), self.sample_interval)
+                sampler.start()
+            start = time.perf_counter()
+            try:
+                return fn(state, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if profiler:
+                    profiler.disable()
+                    threads.stop()
+                if sampler:
+                    sampler.stop()
+                snapshot = self._stop_tracing() if self.trace_memory else None
+                stats = threads.merge_into(pstats.Stats(profiler)) if profiler else None
+                self._record(node_name, artifact, elapsed, stats, sampler, snapshot)
+        return profiled
+
+    def _record(self, node_name, artifact, elapsed, stats, sampler, snapshot):
+        lines = [f"== {os.path.basename(artifact)}: {elapsed * 1000:.1f} ms"]
+
+        if stats:
+            stats.dump_stats(artifact + ".pstats")
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+            lines.append("Hottest functions (self time, all threads):")
+            lines.extend("  " + line for line in _stats_table(out.getvalue()))
+        if sampler:
+            with open(artifact + ".collapsed", "w", encoding="utf-8") as f:
+                for stack, count in sampler.stacks.items():
+                    f.write(f"{stack} {count}\n")
+            self_samples = Counter()
+            for stack, count in sampler.stacks.items():
+                self_samples[stack.rsplit(";", 1)[-1]] += count
+            total = sum(self_samples.values()) or 1
+            lines.append(f"Hottest functions ({total} samples across threads, self):")
+            lines.extend(f"  {count / total:6.1%}  {name}" for name, count in self_samples.most_common(TOP_FUNCTIONS))
+
+        if snapshot is not None:
+            # Leave out the profiler's own bookkeeping (e.g. sampled stacks)
+            stats = snapshot.filter_traces([tracemalloc.Filter(False, __file__)]).statistics("lineno")
+            with open(artifact + ".alloc.txt", "w", encoding="utf-8") as f:
+                for stat in stats[:50]:
+                    f.write(f"{stat}\n")
+            lines.append("Top allocation sites (allocated in this node, live at exit):")
+            lines.extend(f"  {stat}" for stat in stats[:TOP_ALLOCATIONS])
+
+        with self._lock:
+            self.summaries.append("\n".join(lines))
+
+    def finish(self):
+        """Writes summary.txt and returns the summary text."""
+        header = ("Allocation data is scoped per node (allocated during the node, live at exit)."
+                  if self.trace_memory else "Allocation tracking disabled.")
+        summary = "\n\n".join([header] + self.summaries)
+        with open(os.path.join(self.run_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+        return summary
+
+
+def _stats_table(text):
+    """Keeps the column header and rows of a pstats print_stats() listing."""
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip().startswith("ncalls"):
+            return [l for l in lines[i:] if l.strip()]
+    return []